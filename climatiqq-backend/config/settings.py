@@ -33,9 +33,12 @@ ALLOWED_HOSTS = config(
 CORS_ALLOW_ALL_ORIGINS = config(
     'CORS_ALLOW_ALL_ORIGINS', default=True, cast=bool)
 
+# The admin site is only needed on workers that serve /admin/; API-only
+# workers can skip loading it (and its URL routes) with ADMIN_ENABLED=False
+ADMIN_ENABLED = config('ADMIN_ENABLED', default=True, cast=bool)
+
 # Application definition
 INSTALLED_APPS = [
-    'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -45,14 +48,22 @@ INSTALLED_APPS = [
     # Third party apps
     'corsheaders',
     'rest_framework',
-    'rest_framework_simplejwt',
+    # rest_framework_simplejwt is not an app here: it only registers its
+    # translations that way, and leaving it out keeps it (and the django.test
+    # machinery it pulls in) out of startup. It loads with tracker.views, on
+    # the first request routed to /api/v1/ or /logout/ (see config.urls).
 
     # Local apps
     'tracker',
 ]
 
+if ADMIN_ENABLED:
+    INSTALLED_APPS.insert(0, 'django.contrib.admin')
+
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # Must be at the top
+    'tracker.middleware.ConcurrencyLimitMiddleware',
+    'tracker.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -130,6 +141,18 @@ else:
             }
         }
 
+# Cache (forecast fits). The default is per process; point it at a shared
+# backend, e.g. django.core.cache.backends.db.DatabaseCache with
+# CACHE_LOCATION=cache_table after `manage.py createcachetable`, so that
+# `manage.py forecast_users` can warm it for the API workers
+CACHES = {
+    'default': {
+        'BACKEND': config(
+            'CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -187,8 +210,51 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'tracker.throttling.UserTokenBucketThrottle',
+        'tracker.throttling.RouteTokenBucketThrottle',
+    ],
+    # '<count>/<period>[/<burst>]' - buckets live in process memory
+    'DEFAULT_THROTTLE_RATES': {
+        'user': config('THROTTLE_RATE_USER', default='600/min/120'),
+        'entries': config('THROTTLE_RATE_ENTRIES', default='120/min/30'),
+        'stats': config('THROTTLE_RATE_STATS', default='60/min/10'),
+    },
 }
 
+# Admission control: requests in flight per worker process before shedding
+# with 503 (0 disables). The limit is per process, so it only bites where a
+# process serves requests concurrently: uvicorn/ASGI or gunicorn's gthread
+# workers with more threads than this. A sync gunicorn worker handles one
+# request at a time and never reaches it.
+MAX_CONCURRENT_REQUESTS = config('MAX_CONCURRENT_REQUESTS', default=32, cast=int)
+CONCURRENCY_RETRY_AFTER = config('CONCURRENCY_RETRY_AFTER', default=1, cast=int)
+
+# Response compression (br/zstd are used when brotli/zstandard are installed)
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=512, cast=int)
+
+# Group commit for entry creates: single-row POSTs are buffered and written
+# in batches of up to INGEST_MAX_BATCH rows or every INGEST_MAX_DELAY_MS.
+# A full buffer answers 503 + Retry-After; a write not confirmed within
+# INGEST_WAIT_SECONDS answers 202 "pending" (it is still queued)
+INGEST_GROUP_COMMIT = config('INGEST_GROUP_COMMIT', default=False, cast=bool)
+INGEST_MAX_BATCH = config('INGEST_MAX_BATCH', default=100, cast=int)
+INGEST_MAX_DELAY_MS = config('INGEST_MAX_DELAY_MS', default=5, cast=int)
+INGEST_MAX_PENDING = config('INGEST_MAX_PENDING', default=1000, cast=int)
+INGEST_WAIT_SECONDS = config('INGEST_WAIT_SECONDS', default=5, cast=int)
+
+# Server-sent stats events (/api/v1/stats/events/, ASGI only: run under
+# uvicorn config.asgi:application)
+EVENTS_BROKER = config(
+    'EVENTS_BROKER', default='tracker.services.events.InProcessBroker')
+EVENTS_HEARTBEAT_SECONDS = config('EVENTS_HEARTBEAT_SECONDS', default=15, cast=int)
+EVENTS_MAX_STREAM_SECONDS = config('EVENTS_MAX_STREAM_SECONDS', default=300, cast=int)
+EVENTS_MAX_SUBSCRIBERS = config('EVENTS_MAX_SUBSCRIBERS', default=10000, cast=int)
+EVENTS_MAX_PER_USER = config('EVENTS_MAX_PER_USER', default=5, cast=int)
+EVENTS_QUEUE_SIZE = config('EVENTS_QUEUE_SIZE', default=100, cast=int)
+# Lifetime of the ?stream_token= used by EventSource (see StreamTokenView)
+EVENTS_TOKEN_SECONDS = config('EVENTS_TOKEN_SECONDS', default=60, cast=int)
+
 # JWT settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=24),
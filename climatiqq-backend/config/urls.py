@@ -14,14 +14,34 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
-from django.urls import path, include
+from django.urls import URLResolver, path
+from django.urls.resolvers import RoutePattern
 from django.http import JsonResponse
 from django.conf import settings
 from django.conf.urls.static import static
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework import status
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
+
+
+def lazy_include(route, urlconf):
+    """Like include(), but ``urlconf`` is only imported once a request is
+    routed under ``route`` (or a URL is reversed), so /test/ and the like
+    do not load DRF, simplejwt and the tracker views"""
+    return URLResolver(RoutePattern(route, is_endpoint=False), urlconf)
+
+
+def lazy_view(dotted_path):
+    """A class-based view imported on its first call"""
+    view = None
+
+    @csrf_exempt  # DRF views enforce CSRF themselves
+    def wrapper(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(dotted_path).as_view()
+        return view(request, *args, **kwargs)
+    return wrapper
+
 
 def test_view(request):
     """Simple test view to debug 400 errors"""
@@ -78,19 +98,18 @@ def db_test_view(request):
             'error': str(e)
         }, status=500)
 
-class LogoutView(APIView):
-    def post(self, request):
-        return Response({'message': 'Logged out successfully'}, status=status.HTTP_200_OK)
-
 urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('api/v1/', include('tracker.urls')),
+    lazy_include('api/v1/', 'tracker.urls'),
     path('test/', test_view, name='test'),
     path('', test_view, name='root'),
     path('db-test/', db_test_view, name='db_test'),
-    path('logout/', LogoutView.as_view(), name='logout'),
+    path('logout/', lazy_view('tracker.views.LogoutView'), name='logout'),
 ]
 
+if settings.ADMIN_ENABLED:
+    from django.contrib import admin
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
+
 # Serve media files in development
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,101 @@
+"""Track WSGI/ASGI cold-start time across commits.
+
+Runs `manage.py profile_startup --json`, appends one JSON line per run to a
+history file and compares the new numbers with the median of recent runs:
+
+    python scripts/bench_cold_start.py
+    python scripts/bench_cold_start.py --repeat 7 --fail-over 20   # for CI
+
+Exits with status 1 when --fail-over is given and the median process time
+of any entry point regressed by more than that many percent.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(script_dir)
+
+METRICS = ['process_seconds', 'import_seconds', 'first_request_seconds']
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--history', default=os.path.join(script_dir, 'cold_start_history.jsonl'))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--path', default='/test/')
+    parser.add_argument('--baseline-runs', type=int, default=5,
+                        help='Compare against the median of this many previous runs')
+    parser.add_argument('--fail-over', type=float,
+                        help='Exit 1 if process time regressed by more than this percent')
+    args = parser.parse_args()
+
+    proc = subprocess.run(
+        [sys.executable, 'manage.py', 'profile_startup', '--json',
+         '--repeat', str(args.repeat), '--path', args.path],
+        cwd=project_root, capture_output=True, text=True)
+    if proc.returncode:
+        print(proc.stderr, file=sys.stderr)
+        sys.exit(proc.returncode)
+
+    reports = json.loads(proc.stdout)
+    record = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'results': {
+            report['module']: {
+                **{metric: round(report[metric], 4) for metric in METRICS},
+                'modules_imported': report['modules_imported'],
+            }
+            for report in reports
+        },
+    }
+
+    previous = load_history(args.history)[-args.baseline_runs:]
+    with open(args.history, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+    regressed = False
+    for module, result in record['results'].items():
+        print(f'{module} @ {record["commit"] or "unknown"}')
+        for metric in METRICS:
+            line = f'  {metric:<22} {result[metric] * 1000:8.1f} ms'
+            baseline = [run['results'][module][metric] for run in previous
+                        if module in run['results']]
+            if baseline:
+                base = statistics.median(baseline)
+                change = (result[metric] - base) / base * 100 if base else 0
+                line += f'  ({change:+.1f}% vs median of {len(baseline)} runs)'
+                if (metric == 'process_seconds' and args.fail_over is not None
+                        and change > args.fail_over):
+                    regressed = True
+            print(line)
+        print(f'  {"modules_imported":<22} {result["modules_imported"]:8d}')
+
+    print(f'Appended to {args.history}')
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == '__main__':
+    main()
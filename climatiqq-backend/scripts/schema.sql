@@ -54,10 +54,14 @@ COMMENT ON COLUMN auth_user.date_joined IS 'Date and time when user account was
 CREATE TABLE IF NOT EXISTS tracker_impactentry (
     id BIGSERIAL PRIMARY KEY,
     user_id INTEGER NOT NULL,
-    metric_type VARCHAR(20) NOT NULL,
+    -- 1 = carbon, 2 = water, 3 = energy, 4 = digital (tracker.fields.METRIC_CODES)
+    metric_type SMALLINT NOT NULL,
     value DOUBLE PRECISION NOT NULL,
-    description VARCHAR(200) DEFAULT '',
+    -- NULL when empty; an absent value takes no space in the row
+    description VARCHAR(200),
     created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    sync_version BIGINT NOT NULL DEFAULT 0,
     
     -- Foreign key constraint
     CONSTRAINT tracker_impactentry_user_id_fk 
@@ -65,27 +69,38 @@ CREATE TABLE IF NOT EXISTS tracker_impactentry (
         REFERENCES auth_user(id) 
         ON DELETE CASCADE,
     
-    -- Check constraint for metric_type choices
+    -- Check constraint for metric_type codes
     CONSTRAINT tracker_impactentry_metric_type_check 
-        CHECK (metric_type IN ('carbon', 'water', 'energy', 'digital'))
+        CHECK (metric_type BETWEEN 1 AND 4)
 );
 
 -- Indexes for tracker_impactentry
-CREATE INDEX IF NOT EXISTS tracker_impactentry_user_id_idx 
-    ON tracker_impactentry(user_id);
-CREATE INDEX IF NOT EXISTS tracker_impactentry_created_at_idx 
-    ON tracker_impactentry(created_at DESC);
-CREATE INDEX IF NOT EXISTS tracker_impactentry_metric_type_idx 
-    ON tracker_impactentry(metric_type);
+-- Composite indexes follow the API's access patterns: a user's entries
+-- newest first, optionally filtered by metric, and delta sync by version.
+-- Their leading user_id column makes a separate user_id index redundant.
+CREATE INDEX IF NOT EXISTS impactentry_user_created_idx 
+    ON tracker_impactentry(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS impactentry_user_metric_idx 
+    ON tracker_impactentry(user_id, metric_type, created_at DESC);
+CREATE INDEX IF NOT EXISTS impactentry_user_sync_idx 
+    ON tracker_impactentry(user_id, sync_version);
+-- Tiny BRIN index for time-range scans across all users
+CREATE INDEX IF NOT EXISTS impactentry_created_brin_idx 
+    ON tracker_impactentry USING brin (created_at);
 
 -- Comments for tracker_impactentry table
 COMMENT ON TABLE tracker_impactentry IS 'Stores user environmental impact entries';
 COMMENT ON COLUMN tracker_impactentry.id IS 'Primary key - auto-incrementing big integer';
 COMMENT ON COLUMN tracker_impactentry.user_id IS 'Foreign key to auth_user - links entry to user';
-COMMENT ON COLUMN tracker_impactentry.metric_type IS 'Type of metric: carbon, water, energy, or digital';
+COMMENT ON COLUMN tracker_impactentry.metric_type IS 'Metric code: 1 carbon, 2 water, 3 energy, 4 digital';
 COMMENT ON COLUMN tracker_impactentry.value IS 'Numeric value of the environmental impact';
-COMMENT ON COLUMN tracker_impactentry.description IS 'Optional user description of the entry';
+COMMENT ON COLUMN tracker_impactentry.description IS 'Optional user description of the entry (NULL when empty)';
 COMMENT ON COLUMN tracker_impactentry.created_at IS 'Timestamp when entry was created (auto-set)';
+COMMENT ON COLUMN tracker_impactentry.updated_at IS 'Timestamp of the last change (auto-set)';
+COMMENT ON COLUMN tracker_impactentry.sync_version IS 'Per-user change counter value used for delta sync';
+
+-- Other tracker tables (sync state, tombstones, teams, rollups, activity)
+-- are created by the Django migrations in tracker/migrations/.
 
 -- ============================================================================
 -- Django Migration Tracking Tables (if needed)
@@ -119,9 +134,9 @@ VALUES (
 -- Create sample impact entries
 INSERT INTO tracker_impactentry (user_id, metric_type, value, description, created_at)
 VALUES 
-    (1, 'carbon', 5.2, 'Drove to work', CURRENT_TIMESTAMP),
-    (1, 'water', 50.0, 'Daily water usage', CURRENT_TIMESTAMP),
-    (1, 'energy', 10.5, 'Home electricity', CURRENT_TIMESTAMP);
+    (1, 1, 5.2, 'Drove to work', CURRENT_TIMESTAMP),
+    (1, 2, 50.0, 'Daily water usage', CURRENT_TIMESTAMP),
+    (1, 3, 10.5, 'Home electricity', CURRENT_TIMESTAMP);
 */
 
 -- ============================================================================
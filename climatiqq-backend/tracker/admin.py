@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ImpactEntry
+from .models import ImpactEntry, Organization, Team, TeamMembership
 
 # Register your models here.
 
@@ -9,3 +9,23 @@ class ImpactEntryAdmin(admin.ModelAdmin):
     list_filter = ['metric_type', 'created_at', 'user']
     search_fields = ['user__username', 'description']
     date_hierarchy = 'created_at'
+
+
+@admin.register(Organization)
+class OrganizationAdmin(admin.ModelAdmin):
+    list_display = ['name', 'created_at']
+    search_fields = ['name']
+
+
+class TeamMembershipInline(admin.TabularInline):
+    model = TeamMembership
+    extra = 0
+    raw_id_fields = ['user']
+
+
+@admin.register(Team)
+class TeamAdmin(admin.ModelAdmin):
+    list_display = ['name', 'organization', 'created_at']
+    list_filter = ['organization']
+    search_fields = ['name', 'organization__name']
+    inlines = [TeamMembershipInline]
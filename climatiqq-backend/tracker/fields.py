@@ -0,0 +1,46 @@
+from django.db import models
+
+METRIC_CHOICES = [
+    ('carbon', 'Carbon Footprint'),
+    ('water', 'Water Usage'),
+    ('energy', 'Energy Consumption'),
+    ('digital', 'Digital Usage'),
+]
+
+# Stored codes are part of the schema: never renumber, only append
+METRIC_CODES = {'carbon': 1, 'water': 2, 'energy': 3, 'digital': 4}
+METRIC_SLUGS = {code: slug for slug, code in METRIC_CODES.items()}
+
+
+class MetricTypeField(models.PositiveSmallIntegerField):
+    """Metric type stored as a 2-byte code but exposed as its slug.
+
+    Python code, filters and serializers keep using ``'carbon'`` etc.; only
+    the column holds the small integer from ``METRIC_CODES``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('choices', METRIC_CHOICES)
+        super().__init__(*args, **kwargs)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return METRIC_SLUGS[value]
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return METRIC_SLUGS[int(value)]
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, int):
+            return value
+        try:
+            return METRIC_CODES[value]
+        except KeyError:
+            raise ValueError(f"Unknown metric type {value!r}.") from None
+
+    def formfield(self, **kwargs):
+        # Choices are slugs, so skip the integer form field
+        return models.Field.formfield(self, **kwargs)
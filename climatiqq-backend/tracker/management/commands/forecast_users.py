@@ -0,0 +1,49 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tracker.services import forecast
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Fit forecasts for every user in batches and cache them. Warming only '
+        'helps the API when CACHE_BACKEND is shared between processes; use '
+        '--output to also write one JSON line per user.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Users fitted together in one array (default 1000)')
+        parser.add_argument('--output', help='Write {"user": id, "metrics": ...} lines here')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        batch_size = max(options['batch_size'], 1)
+        user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+        output = open(options['output'], 'w') if options['output'] else None
+
+        started = time.monotonic()
+        try:
+            for i in range(0, len(user_ids), batch_size):
+                fitted = forecast.warm(user_ids[i:i + batch_size], today)
+                if output:
+                    for user_id, params in fitted.items():
+                        output.write(json.dumps({
+                            'user': user_id,
+                            'metrics': forecast.project(params, today),
+                        }) + '\n')
+                self.stdout.write(f'{min(i + batch_size, len(user_ids))}/{len(user_ids)} users')
+        finally:
+            if output:
+                output.close()
+
+        elapsed = time.monotonic() - started
+        rate = len(user_ids) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Forecast {len(user_ids)} users in {elapsed:.1f}s ({rate:,.0f} users/s)'))
@@ -0,0 +1,171 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter under ``-X importtime``: import the server entry
+# point, serve one request in-process and print the timings as JSON
+CHILD = r'''
+import json, os, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {base_dir!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+import importlib
+application = importlib.import_module({module!r}).application
+imported = time.perf_counter()
+
+if {module!r}.endswith('asgi'):
+    import asyncio
+    scope = {{
+        'type': 'http', 'asgi': {{'version': '3.0'}}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': {path!r}, 'raw_path': {path!r}.encode(),
+        'query_string': b'', 'root_path': '', 'server': ('localhost', 80),
+        'client': ('127.0.0.1', 0), 'headers': [(b'host', {host!r}.encode())],
+    }}
+    messages = []
+
+    async def receive():
+        return {{'type': 'http.request', 'body': b'', 'more_body': False}}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    status = messages[0]['status']
+else:
+    import io
+    environ = {{
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': {path!r}, 'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': {host!r}, 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http', 'wsgi.version': (1, 0),
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }}
+    statuses = []
+    body = b''.join(application(environ, lambda s, h, e=None: statuses.append(s)))
+    status = int(statuses[0].split()[0])
+
+finished = time.perf_counter()
+print(json.dumps({{
+    'import_seconds': imported - started,
+    'first_request_seconds': finished - imported,
+    'status': status,
+}}))
+'''
+
+IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+def parse_importtime(stderr):
+    """``-X importtime`` lines as ``(module, self_us, cumulative_us, depth)``"""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def package_totals(rows):
+    """Self time summed per top-level package, in seconds"""
+    totals = defaultdict(int)
+    for module, self_us, _, _ in rows:
+        totals[module.split('.')[0]] += self_us
+    return {package: us / 1e6 for package, us in totals.items()}
+
+
+def run_once(module, path, host):
+    code = CHILD.format(base_dir=str(settings.BASE_DIR), module=module, path=path, host=host)
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'},
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode:
+        lines = [line for line in proc.stderr.splitlines() if not line.startswith('import time:')]
+        raise CommandError(f'{module} failed to start:\n' + '\n'.join(lines[-20:]))
+
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['process_seconds'] = wall
+    result['imports'] = parse_importtime(proc.stderr)
+    return result
+
+
+def profile(module, path='/test/', host='localhost', repeat=3, top=15):
+    """Median timings over ``repeat`` cold starts plus the slowest imports"""
+    runs = [run_once(module, path, host) for _ in range(repeat)]
+    median = min(runs, key=lambda run: abs(
+        run['process_seconds'] - statistics.median(r['process_seconds'] for r in runs)))
+    imports = median['imports']
+    return {
+        'module': module,
+        'path': path,
+        'status': median['status'],
+        'repeat': repeat,
+        'process_seconds': statistics.median(r['process_seconds'] for r in runs),
+        'import_seconds': statistics.median(r['import_seconds'] for r in runs),
+        'first_request_seconds': statistics.median(r['first_request_seconds'] for r in runs),
+        'modules_imported': len(imports),
+        'packages': dict(sorted(
+            package_totals(imports).items(), key=lambda item: -item[1])[:top]),
+        'slowest_imports': [
+            {'module': module, 'self_seconds': self_us / 1e6,
+             'cumulative_seconds': cumulative_us / 1e6}
+            for module, self_us, cumulative_us, _ in sorted(
+                imports, key=lambda row: -row[1])[:top]
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure cold start of the WSGI/ASGI entry points: each run is a fresh '
+        'interpreter that imports the module and serves one request in-process. '
+        'Reports the median import time, time to first request and the '
+        'packages that cost the most import time.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', action='append', choices=['config.wsgi', 'config.asgi'],
+                            help='Entry point to profile (default: both)')
+        parser.add_argument('--path', default='/test/', help='Path of the first request')
+        parser.add_argument('--host', default='localhost', help='Host header to send')
+        parser.add_argument('--repeat', type=int, default=3, help='Cold starts per module')
+        parser.add_argument('--top', type=int, default=15, help='Packages/modules to list')
+        parser.add_argument('--json', action='store_true', help='Print raw JSON')
+
+    def handle(self, *args, **options):
+        reports = [
+            profile(module, options['path'], options['host'],
+                    max(options['repeat'], 1), options['top'])
+            for module in options['module'] or ['config.wsgi', 'config.asgi']
+        ]
+        if options['json']:
+            self.stdout.write(json.dumps(reports, indent=2))
+            return
+
+        for report in reports:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{report['module']} (median of {report['repeat']}, "
+                f"GET {report['path']} -> {report['status']})"))
+            self.stdout.write(f"  process total:     {report['process_seconds'] * 1000:8.1f} ms")
+            self.stdout.write(f"  import module:     {report['import_seconds'] * 1000:8.1f} ms")
+            self.stdout.write(f"  first request:     {report['first_request_seconds'] * 1000:8.1f} ms")
+            self.stdout.write(f"  modules imported:  {report['modules_imported']:8d}")
+            self.stdout.write('  import time by package (self):')
+            for package, seconds in report['packages'].items():
+                self.stdout.write(f'    {package:<28} {seconds * 1000:8.1f} ms')
+            self.stdout.write('  slowest modules (self / cumulative):')
+            for row in report['slowest_imports']:
+                self.stdout.write(
+                    f"    {row['module']:<40} {row['self_seconds'] * 1000:7.1f} ms"
+                    f" / {row['cumulative_seconds'] * 1000:7.1f} ms")
@@ -0,0 +1,197 @@
+import json
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import Max, Min, Sum
+from django.utils import timezone
+
+# Models are imported inside the functions below: a spawned worker imports
+# this module to unpickle its task before _init_worker has set Django up.
+
+
+def _init_worker():
+    # Spawned workers start from a bare interpreter; forked ones inherit an
+    # initialised Django. Either way each worker opens its own connection.
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def _mp_context():
+    # Fork skips re-importing Django in every worker; spawn is the fallback
+    # where fork is unavailable
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def recompute_user_range(start, end, chunk_size):
+    """Rebuild the per-user rollups for users with ``start <= id < end``.
+
+    Entries are streamed once in user order with a server-side chunked
+    iterator, so memory is bounded by the number of distinct rollup rows in
+    the range rather than by the number of entries.
+    """
+    from tracker.models import ActivityYear, ImpactEntry, UserDailyTotal, UserMetricTotal
+    from tracker.services.activity import day_bit
+
+    totals = defaultdict(lambda: [0.0, 0])
+    daily = defaultdict(lambda: [0.0, 0])
+    active = defaultdict(int)
+    rows = 0
+
+    entries = ImpactEntry.objects.filter(
+        user_id__gte=start, user_id__lt=end,
+    ).order_by().values_list('user_id', 'metric_type', 'value', 'created_at')
+
+    for user_id, metric, value, created_at in entries.iterator(chunk_size=chunk_size):
+        day = timezone.localdate(created_at)
+        totals[user_id, metric][0] += value
+        totals[user_id, metric][1] += 1
+        daily[user_id, day, metric][0] += value
+        daily[user_id, day, metric][1] += 1
+        active[user_id, day.year] |= day_bit(day)
+        rows += 1
+
+    with transaction.atomic():
+        UserMetricTotal.objects.filter(user_id__gte=start, user_id__lt=end).delete()
+        UserDailyTotal.objects.filter(user_id__gte=start, user_id__lt=end).delete()
+        ActivityYear.objects.filter(user_id__gte=start, user_id__lt=end).delete()
+        UserMetricTotal.objects.bulk_create([
+            UserMetricTotal(user_id=user_id, metric_type=metric,
+                            total_value=value, entry_count=count)
+            for (user_id, metric), (value, count) in totals.items()
+        ], batch_size=1000)
+        UserDailyTotal.objects.bulk_create([
+            UserDailyTotal(user_id=user_id, day=day, metric_type=metric,
+                           total_value=value, entry_count=count)
+            for (user_id, day, metric), (value, count) in daily.items()
+        ], batch_size=1000)
+        activity_rows = []
+        for (user_id, year), mask in active.items():
+            row = ActivityYear(user_id=user_id, year=year)
+            row.mask = mask
+            activity_rows.append(row)
+        ActivityYear.objects.bulk_create(activity_rows, batch_size=1000)
+
+    return start, end, rows
+
+
+def recompute_team(team_id):
+    """Rebuild a team's rollups by summing its members' per-user rollups"""
+    from tracker.models import TeamDailyTotal, TeamMetricTotal, UserDailyTotal, UserMetricTotal
+
+    member_totals = UserMetricTotal.objects.filter(
+        user__team_memberships__team_id=team_id,
+    ).values('metric_type').annotate(total=Sum('total_value'), count=Sum('entry_count'))
+    member_daily = UserDailyTotal.objects.filter(
+        user__team_memberships__team_id=team_id,
+    ).values('day', 'metric_type').annotate(total=Sum('total_value'), count=Sum('entry_count'))
+
+    with transaction.atomic():
+        TeamMetricTotal.objects.filter(team_id=team_id).delete()
+        TeamDailyTotal.objects.filter(team_id=team_id).delete()
+        TeamMetricTotal.objects.bulk_create([
+            TeamMetricTotal(team_id=team_id, metric_type=row['metric_type'],
+                            total_value=row['total'], entry_count=row['count'])
+            for row in member_totals
+        ], batch_size=1000)
+        TeamDailyTotal.objects.bulk_create([
+            TeamDailyTotal(team_id=team_id, day=row['day'], metric_type=row['metric_type'],
+                           total_value=row['total'], entry_count=row['count'])
+            for row in member_daily
+        ], batch_size=1000)
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute per-user rollups and activity bitmaps, and per-team rollups, '
+        'from ImpactEntry in parallel. '
+        'Users are split into id ranges processed by a pool of worker '
+        'processes; finished ranges are checkpointed so an interrupted run '
+        'can continue with --resume. Writes made while a range is being '
+        'rebuilt can be lost, so run it when entry traffic is low.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--range-size', type=int, default=500,
+                            help='User ids per work unit')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows fetched per round trip when streaming entries')
+        parser.add_argument('--checkpoint', default='.recompute_rollups.json',
+                            help='File recording finished id ranges')
+        parser.add_argument('--resume', action='store_true',
+                            help='Skip ranges recorded in the checkpoint file')
+        parser.add_argument('--skip-teams', action='store_true',
+                            help='Only rebuild per-user rollups')
+
+    def handle(self, *args, **options):
+        from tracker.models import Team
+
+        bounds = get_user_model().objects.aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            self.stdout.write('No users to process.')
+            return
+
+        size = options['range_size']
+        ranges = [(start, start + size)
+                  for start in range(bounds['low'], bounds['high'] + 1, size)]
+
+        completed = set()
+        if options['resume'] and os.path.exists(options['checkpoint']):
+            with open(options['checkpoint']) as f:
+                completed = {tuple(r) for r in json.load(f)['completed']}
+        pending = [r for r in ranges if r not in completed]
+        self.stdout.write(
+            f'{len(pending)} of {len(ranges)} user ranges to process '
+            f'with {options["workers"]} workers')
+
+        # Never hand an open connection to forked workers
+        connections.close_all()
+
+        started = time.monotonic()
+        total_rows = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=_mp_context(),
+                                 initializer=_init_worker) as pool:
+            futures = [pool.submit(recompute_user_range, start, end, options['chunk_size'])
+                       for start, end in pending]
+            for done, future in enumerate(as_completed(futures), 1):
+                start, end, rows = future.result()
+                completed.add((start, end))
+                self._save_checkpoint(options['checkpoint'], completed)
+
+                total_rows += rows
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'[{done}/{len(pending)}] users {start}-{end - 1}: {rows} entries '
+                    f'({total_rows / max(elapsed, 1e-9):,.0f} rows/s overall)')
+
+        if not options['skip_teams']:
+            team_ids = list(Team.objects.values_list('id', flat=True))
+            for team_id in team_ids:
+                recompute_team(team_id)
+            self.stdout.write(f'Rebuilt rollups for {len(team_ids)} teams')
+
+        if os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {total_rows} entries in {elapsed:.1f}s '
+            f'({total_rows / max(elapsed, 1e-9):,.0f} rows/s)'))
+
+    @staticmethod
+    def _save_checkpoint(path, completed):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'completed': sorted(completed)}, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,83 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+
+from tracker.models import ImpactEntry
+
+TABLE = ImpactEntry._meta.db_table
+
+
+def postgres_report(cursor):
+    cursor.execute(
+        f'SELECT count(*), coalesce(avg(pg_column_size(t.*)), 0) FROM {TABLE} t')
+    rows, avg_row = cursor.fetchone()
+    cursor.execute('SELECT pg_table_size(%s), pg_indexes_size(%s)', [TABLE, TABLE])
+    table_bytes, index_bytes = cursor.fetchone()
+    cursor.execute(
+        'SELECT indexrelname, pg_relation_size(indexrelid) FROM pg_stat_user_indexes '
+        'WHERE relname = %s ORDER BY indexrelname', [TABLE])
+    return {
+        'rows': rows,
+        'avg_row_bytes': float(avg_row),
+        'table_bytes': table_bytes,
+        'index_bytes': index_bytes,
+        'indexes': dict(cursor.fetchall()),
+    }
+
+
+def sqlite_report(cursor):
+    cursor.execute(f'SELECT count(*) FROM {TABLE}')
+    rows = cursor.fetchone()[0]
+    try:
+        cursor.execute(
+            "SELECT name, sum(pgsize) FROM dbstat WHERE name = %s "
+            "OR name IN (SELECT name FROM sqlite_master WHERE type = 'index' "
+            "AND tbl_name = %s) GROUP BY name", [TABLE, TABLE])
+    except DatabaseError:
+        # SQLite built without the dbstat virtual table
+        return {'rows': rows}
+
+    sizes = dict(cursor.fetchall())
+    table_bytes = sizes.pop(TABLE, 0)
+    return {
+        'rows': rows,
+        'avg_row_bytes': table_bytes / rows if rows else 0,
+        'table_bytes': table_bytes,
+        'index_bytes': sum(sizes.values()),
+        'indexes': sizes,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Report ImpactEntry row and index sizes. Run before and after '
+        'migrating (with --json to keep the numbers) to compare layouts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Print raw JSON')
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                report = postgres_report(cursor)
+            elif connection.vendor == 'sqlite':
+                report = sqlite_report(cursor)
+            else:
+                self.stderr.write(f'Unsupported database: {connection.vendor}')
+                return
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"{TABLE}: {report['rows']} rows")
+        if 'table_bytes' not in report:
+            self.stdout.write('Size statistics are not available on this database.')
+            return
+        self.stdout.write(f"  bytes per row: {report['avg_row_bytes']:.1f}")
+        self.stdout.write(f"  table: {report['table_bytes']:,} bytes")
+        self.stdout.write(f"  indexes: {report['index_bytes']:,} bytes")
+        for name, size in report['indexes'].items():
+            self.stdout.write(f'    {name}: {size:,} bytes')
@@ -0,0 +1,170 @@
+import re
+import threading
+import zlib
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+
+class ConcurrencyLimitMiddleware:
+    """Shed load once too many requests are in flight in this process.
+
+    Requests beyond ``MAX_CONCURRENT_REQUESTS`` are rejected immediately with
+    503 and ``Retry-After`` rather than queueing behind busy workers. A limit
+    of 0 disables the check. The count is per process, so it needs a server
+    that runs several requests per process (ASGI or threaded workers).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.limit = getattr(settings, 'MAX_CONCURRENT_REQUESTS', 0)
+        self.retry_after = getattr(settings, 'CONCURRENCY_RETRY_AFTER', 1)
+        self.slots = threading.BoundedSemaphore(self.limit) if self.limit else None
+
+    def __call__(self, request):
+        if self.slots is None:
+            return self.get_response(request)
+
+        if not self.slots.acquire(blocking=False):
+            response = JsonResponse(
+                {'detail': 'Server is busy, please retry shortly.'}, status=503)
+            response['Retry-After'] = str(self.retry_after)
+            return response
+
+        try:
+            return self.get_response(request)
+        finally:
+            self.slots.release()
+
+
+def _gzip_compressor():
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    return (compressor.compress,
+            lambda: compressor.flush(zlib.Z_SYNC_FLUSH),
+            compressor.flush)
+
+
+def _brotli_compressor():
+    compressor = brotli.Compressor(quality=5)
+    return compressor.process, compressor.flush, compressor.finish
+
+
+def _zstd_compressor():
+    compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    return (compressor.compress,
+            lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+            compressor.flush)
+
+
+# Server preference order; encodings whose module is missing are skipped
+COMPRESSORS = {
+    'br': _brotli_compressor if brotli else None,
+    'zstd': _zstd_compressor if zstandard else None,
+    'gzip': _gzip_compressor,
+}
+
+accept_encoding_re = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*')
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick the best available encoding for an Accept-Encoding header."""
+    weights = {}
+    for item in accept_encoding.split(','):
+        match = accept_encoding_re.fullmatch(item)
+        if not match:
+            continue
+        try:
+            weights[match[1].lower()] = float(match[2]) if match[2] else 1.0
+        except ValueError:
+            continue
+
+    best, best_weight = None, 0
+    for encoding, factory in COMPRESSORS.items():
+        if factory is None:
+            continue
+        weight = weights.get(encoding, weights.get('*', 0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class CompressionMiddleware:
+    """Negotiated br/zstd/gzip compression for API responses.
+
+    Like Django's GZipMiddleware, but picks the encoding from Accept-Encoding,
+    leaves bodies under ``COMPRESSION_MIN_SIZE`` alone and, for streaming
+    responses, flushes after every chunk so streamed data is not held back.
+    Event streams are never compressed.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 512)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        factory = COMPRESSORS[encoding]
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._compress_async(
+                    factory, response.streaming_content)
+            else:
+                response.streaming_content = self._compress_stream(
+                    factory, response.streaming_content)
+            del response['Content-Length']
+        else:
+            compress, _, finish = factory()
+            compressed = compress(response.content) + finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The representation changed, so a strong ETag no longer applies
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def _compress_stream(factory, chunks):
+        compress, flush, finish = factory()
+        for chunk in chunks:
+            yield compress(chunk) + flush()
+        yield finish()
+
+    @staticmethod
+    async def _compress_async(factory, chunks):
+        compress, flush, finish = factory()
+        async for chunk in chunks:
+            yield compress(chunk) + flush()
+        yield finish()
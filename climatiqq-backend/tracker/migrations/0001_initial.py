@@ -0,0 +1,32 @@
+# Generated by Django 4.2.24 on 2026-10-19 05:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImpactEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric_type', models.CharField(choices=[('carbon', 'Carbon Footprint'), ('water', 'Water Usage'), ('energy', 'Energy Consumption'), ('digital', 'Digital Usage')], max_length=20)),
+                ('value', models.FloatField()),
+                ('description', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='impact_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Impact Entries',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,203 @@
+# Generated by Django 4.2.24 on 2026-10-19 05:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import tracker.fields
+import tracker.operations
+
+
+class Migration(migrations.Migration):
+    # The (user, sync_version) index on the existing entry table is built
+    # concurrently in 0005, outside this transaction
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('tracker', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityYear',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('bits', models.BinaryField(default=bytes)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EntryTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_id', models.BigIntegerField()),
+                ('sync_version', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Organization',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SyncState',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sync_state', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Team',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TeamDailyTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric_type', tracker.fields.MetricTypeField(choices=[('carbon', 'Carbon Footprint'), ('water', 'Water Usage'), ('energy', 'Energy Consumption'), ('digital', 'Digital Usage')])),
+                ('total_value', models.FloatField(default=0)),
+                ('entry_count', models.IntegerField(default=0)),
+                ('day', models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TeamMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('member', 'Member'), ('manager', 'Manager')], default='member', max_length=20)),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TeamMetricTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric_type', tracker.fields.MetricTypeField(choices=[('carbon', 'Carbon Footprint'), ('water', 'Water Usage'), ('energy', 'Energy Consumption'), ('digital', 'Digital Usage')])),
+                ('total_value', models.FloatField(default=0)),
+                ('entry_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserDailyTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric_type', tracker.fields.MetricTypeField(choices=[('carbon', 'Carbon Footprint'), ('water', 'Water Usage'), ('energy', 'Energy Consumption'), ('digital', 'Digital Usage')])),
+                ('total_value', models.FloatField(default=0)),
+                ('entry_count', models.IntegerField(default=0)),
+                ('day', models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserMetricTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric_type', tracker.fields.MetricTypeField(choices=[('carbon', 'Carbon Footprint'), ('water', 'Water Usage'), ('energy', 'Energy Consumption'), ('digital', 'Digital Usage')])),
+                ('total_value', models.FloatField(default=0)),
+                ('entry_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='impactentry',
+            name='sync_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='impactentry',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        # Database-side defaults let code that predates these columns keep
+        # inserting until the deploy finishes; dropped again in 0006
+        tracker.operations.RunPostgresSQL(
+            "ALTER TABLE tracker_impactentry "
+            "ALTER COLUMN updated_at SET DEFAULT now(), "
+            "ALTER COLUMN sync_version SET DEFAULT 0",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddField(
+            model_name='usermetrictotal',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metric_totals', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='userdailytotal',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_totals', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='teammetrictotal',
+            name='team',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metric_totals', to='tracker.team'),
+        ),
+        migrations.AddField(
+            model_name='teammembership',
+            name='organization',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='tracker.organization'),
+        ),
+        migrations.AddField(
+            model_name='teammembership',
+            name='team',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='tracker.team'),
+        ),
+        migrations.AddField(
+            model_name='teammembership',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='team_memberships', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='teamdailytotal',
+            name='team',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_totals', to='tracker.team'),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='teams', to='tracker.organization'),
+        ),
+        migrations.AddField(
+            model_name='entrytombstone',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entry_tombstones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='activityyear',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_years', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='usermetrictotal',
+            constraint=models.UniqueConstraint(fields=('user', 'metric_type'), name='unique_user_metric_total'),
+        ),
+        migrations.AddConstraint(
+            model_name='userdailytotal',
+            constraint=models.UniqueConstraint(fields=('user', 'day', 'metric_type'), name='unique_user_daily_total'),
+        ),
+        migrations.AddConstraint(
+            model_name='teammetrictotal',
+            constraint=models.UniqueConstraint(fields=('team', 'metric_type'), name='unique_team_metric_total'),
+        ),
+        migrations.AddConstraint(
+            model_name='teammembership',
+            constraint=models.UniqueConstraint(fields=('organization', 'user'), name='one_team_per_organization'),
+        ),
+        migrations.AddConstraint(
+            model_name='teamdailytotal',
+            constraint=models.UniqueConstraint(fields=('team', 'day', 'metric_type'), name='unique_team_daily_total'),
+        ),
+        migrations.AddIndex(
+            model_name='entrytombstone',
+            index=models.Index(fields=['user', 'sync_version'], name='tombstone_user_sync_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='activityyear',
+            constraint=models.UniqueConstraint(fields=('user', 'year'), name='unique_user_activity_year'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+"""Expand step of the ImpactEntry storage redesign.
+
+Only additive changes that take a brief lock: a nullable ``metric_code``
+column and a nullable ``description``. Code from before the redesign keeps
+working against this schema, so this migration can run ahead of the deploy.
+On PostgreSQL a trigger fills the new columns for every row that code writes
+from here on, and the highest id at that point is recorded so the locked
+catch-up in 0006 only has to look at newer rows. 0004 backfills the rest
+online, 0005 builds indexes and 0006 finishes the switch.
+"""
+from django.db import migrations, models
+
+import tracker.operations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0002_sync_teams_activity'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='impactentry',
+            name='description',
+            field=models.CharField(blank=True, max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='impactentry',
+            name='metric_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        tracker.operations.RunPostgresSQL(
+            tracker.operations.METRIC_CODE_TRIGGER_SQL,
+            reverse_sql=tracker.operations.DROP_METRIC_CODE_TRIGGER_SQL,
+        ),
+        # After the trigger, in the same transaction: every row above the
+        # mark has gone through it
+        migrations.RunPython(
+            tracker.operations.record_storage_mark,
+            reverse_code=tracker.operations.drop_storage_mark,
+        ),
+    ]
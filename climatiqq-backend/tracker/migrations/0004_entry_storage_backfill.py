@@ -0,0 +1,33 @@
+"""Online backfill for the ImpactEntry storage redesign.
+
+Non-atomic so each batch commits on its own and no long lock is held; every
+step only touches rows that still need it, so a failed run can be repeated.
+Ends by validating a ``metric_code IS NOT NULL`` check, which lets 0006 set
+NOT NULL on PostgreSQL without scanning the table.
+"""
+from django.db import migrations
+
+import tracker.operations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('tracker', '0003_entry_storage_expand'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            tracker.operations.backfill_entry_storage,
+            reverse_code=migrations.RunPython.noop,
+        ),
+        migrations.RunPython(
+            tracker.operations.init_sync_state,
+            reverse_code=migrations.RunPython.noop,
+        ),
+        tracker.operations.RunPostgresSQL(
+            tracker.operations.ADD_METRIC_CODE_CHECK_SQL,
+            reverse_sql=tracker.operations.DROP_METRIC_CODE_CHECK_SQL,
+        ),
+    ]
@@ -0,0 +1,35 @@
+"""Indexes on the existing entry table for sync and the storage redesign.
+
+Built with CREATE INDEX CONCURRENTLY, which cannot run inside a transaction,
+so writes keep flowing during the build. Nothing else happens here, so a
+failed build can simply be run again.
+"""
+from django.db import migrations, models
+
+import tracker.operations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('tracker', '0004_entry_storage_backfill'),
+    ]
+
+    operations = [
+        tracker.operations.AddIndexOnline(
+            model_name='impactentry',
+            index=models.Index(fields=['user', 'sync_version'], name='impactentry_user_sync_idx'),
+        ),
+        tracker.operations.RunPostgresSQL(
+            ['DROP INDEX CONCURRENTLY IF EXISTS impactentry_created_brin_idx',
+             'CREATE INDEX CONCURRENTLY impactentry_created_brin_idx '
+             'ON tracker_impactentry USING brin (created_at)'],
+            reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS impactentry_created_brin_idx',
+        ),
+        tracker.operations.AddIndexOnline(
+            model_name='impactentry',
+            index=models.Index(fields=['user', '-created_at'],
+                               name='impactentry_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+"""Contract step of the ImpactEntry storage redesign.
+
+Run together with the deploy of code that reads ``metric_type`` as a small
+integer. In one transaction: lock the table against writes (reads continue),
+catch up the rows written since 0003 recorded its mark, swap the columns and
+drop the standalone ``user_id`` index. The catch-up only reads ids above
+the mark, and SET NOT NULL is satisfied by the check validated in 0004, so
+the lock is held briefly. A failure leaves the schema untouched. The
+composite index that replaces ``user_id`` is built concurrently in 0007.
+"""
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+import tracker.fields
+import tracker.operations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tracker', '0005_entry_storage_indexes'),
+    ]
+
+    operations = [
+        # Hold off writers until commit so the catch-up below sees every row
+        tracker.operations.RunPostgresSQL(
+            'LOCK TABLE tracker_impactentry IN SHARE ROW EXCLUSIVE MODE',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunPython(
+            tracker.operations.catch_up_entry_storage,
+            reverse_code=migrations.RunPython.noop,
+        ),
+        tracker.operations.RunPostgresSQL(
+            tracker.operations.DROP_METRIC_CODE_TRIGGER_SQL,
+            reverse_sql=tracker.operations.METRIC_CODE_TRIGGER_SQL,
+        ),
+        migrations.RemoveField(
+            model_name='impactentry',
+            name='metric_type',
+        ),
+        migrations.RenameField(
+            model_name='impactentry',
+            old_name='metric_code',
+            new_name='metric_type',
+        ),
+        migrations.AlterField(
+            model_name='impactentry',
+            name='metric_type',
+            field=tracker.fields.MetricTypeField(choices=[('carbon', 'Carbon Footprint'), ('water', 'Water Usage'), ('energy', 'Energy Consumption'), ('digital', 'Digital Usage')]),
+        ),
+        tracker.operations.RunPostgresSQL(
+            tracker.operations.DROP_METRIC_CODE_CHECK_SQL,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='impactentry',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='impact_entries', to=settings.AUTH_USER_MODEL),
+        ),
+        tracker.operations.RunPostgresSQL(
+            "ALTER TABLE tracker_impactentry "
+            "ALTER COLUMN updated_at DROP DEFAULT, "
+            "ALTER COLUMN sync_version DROP DEFAULT",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunPython(
+            tracker.operations.drop_storage_mark,
+            reverse_code=tracker.operations.record_storage_mark,
+        ),
+    ]
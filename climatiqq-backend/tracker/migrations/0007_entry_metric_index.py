@@ -0,0 +1,25 @@
+"""The (user, metric_type, created_at) index of the storage redesign.
+
+Needs the renamed column from 0006 and is kept apart from it so it can be
+built with CREATE INDEX CONCURRENTLY, which cannot run inside a
+transaction. Writes keep flowing during the build.
+"""
+from django.db import migrations, models
+
+import tracker.operations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('tracker', '0006_entry_storage_contract'),
+    ]
+
+    operations = [
+        tracker.operations.AddIndexOnline(
+            model_name='impactentry',
+            index=models.Index(fields=['user', 'metric_type', '-created_at'],
+                               name='impactentry_user_metric_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+"""PostgreSQL full-text index on ImpactEntry descriptions.
+
+The index leads with ``user_id`` (GIN over a plain column needs the
+``btree_gin`` extension), so a search only walks the posting lists of the
+searching user's entries instead of every user's matches for a common term.
+It is built CONCURRENTLY, so writes keep flowing during the build, and it
+replaces the user-agnostic index that older releases created after migrate.
+The expression must stay in step with ``TS_VECTOR`` in
+``tracker.services.search``. SQLite gets its FTS5 table from the
+``post_migrate`` hook instead.
+"""
+from django.db import migrations
+
+import tracker.operations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('tracker', '0007_entry_metric_index'),
+    ]
+
+    operations = [
+        tracker.operations.RunPostgresSQL(
+            'CREATE EXTENSION IF NOT EXISTS btree_gin',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        tracker.operations.RunPostgresSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS impactentry_user_description_fts_idx '
+            "ON tracker_impactentry USING gin "
+            "(user_id, to_tsvector('english', coalesce(description, '')))",
+            reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS impactentry_user_description_fts_idx',
+        ),
+        tracker.operations.RunPostgresSQL(
+            'DROP INDEX CONCURRENTLY IF EXISTS impactentry_description_fts_idx',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
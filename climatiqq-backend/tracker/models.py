@@ -1,29 +1,285 @@
 
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 
+from .fields import METRIC_CHOICES, MetricTypeField
+
 User = get_user_model()
 
 class ImpactEntry(models.Model):
     """Core model - tracks user's environmental impact"""
 
-    METRIC_CHOICES = [
-        ('carbon', 'Carbon Footprint'),
-        ('water', 'Water Usage'),
-        ('energy', 'Energy Consumption'),
-        ('digital', 'Digital Usage'),
-    ]
+    METRIC_CHOICES = METRIC_CHOICES
 
+    # Covered by the (user, ...) composite indexes below
     user = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name='impact_entries')
-    metric_type = models.CharField(max_length=20, choices=METRIC_CHOICES)
+        User, on_delete=models.CASCADE, related_name='impact_entries',
+        db_index=False)
+    metric_type = MetricTypeField()
     value = models.FloatField()
-    description = models.CharField(max_length=200, blank=True)
+    # NULL rather than '' when empty, which costs no space in the row
+    description = models.CharField(max_length=200, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Per-user change counter value at the last write (see SyncState)
+    sync_version = models.BigIntegerField(default=0, editable=False)
+
+    # (metric_type, value) as last loaded from or written to the database
+    saved_state = None
 
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Impact Entries"
+        # PostgreSQL also gets a BRIN index on created_at for time-range scans
+        # across users (see migration 0005)
+        indexes = [
+            models.Index(fields=['user', '-created_at'],
+                         name='impactentry_user_created_idx'),
+            models.Index(fields=['user', 'metric_type', '-created_at'],
+                         name='impactentry_user_metric_idx'),
+            models.Index(fields=['user', 'sync_version'],
+                         name='impactentry_user_sync_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.metric_type}: {self.value}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        # With either field deferred, leave it to save() to read the old state
+        if 'metric_type' in loaded and 'value' in loaded:
+            instance.saved_state = (loaded['metric_type'], loaded['value'])
+        return instance
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            if self.pk is not None and self.saved_state is None:
+                self.saved_state = type(self).objects.filter(pk=self.pk).values_list(
+                    'metric_type', 'value').first()
+            deferred = self.get_deferred_fields()
+            self.sync_version = SyncState.allocate(self.user_id)
+            if kwargs.get('update_fields') is None and deferred and self.pk is not None:
+                # Django would only save the loaded fields; keep them explicit
+                # so the sync bookkeeping below is written too
+                kwargs['update_fields'] = {
+                    field.attname for field in self._meta.concrete_fields
+                    if not field.primary_key and field.attname not in deferred}
+            if kwargs.get('update_fields') is not None:
+                # Partial saves must still publish the change to syncing clients
+                kwargs['update_fields'] = {
+                    *kwargs['update_fields'], 'sync_version', 'updated_at'}
+            super().save(*args, **kwargs)
+        # post_save receivers see the previous state; refresh it afterwards
+        self.saved_state = (self.metric_type, self.value)
+
+
+class SyncState(models.Model):
+    """Monotonic per-user change counter used as the delta sync token"""
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name='sync_state')
+    version = models.BigIntegerField(default=0)
+
+    @classmethod
+    def allocate(cls, user_id, count=1):
+        """Reserve ``count`` versions and return the highest one.
+
+        Must run inside a transaction: the row lock serialises writers for
+        the same user so versions become visible in increasing order.
+        """
+        state, _ = cls.objects.select_for_update().get_or_create(user_id=user_id)
+        state.version += count
+        state.save(update_fields=['version'])
+        return state.version
+
+    @classmethod
+    def lock(cls, *user_ids):
+        """Take the row locks that entry writers hold, in user id order.
+
+        Must run inside a transaction. Lets other writers of a user's
+        rollups wait for in-flight entry changes to commit first.
+        """
+        for user_id in sorted(set(user_ids)):
+            cls.objects.select_for_update().get_or_create(user_id=user_id)
+
+
+class EntryTombstone(models.Model):
+    """Record of a deleted ImpactEntry so syncing clients can drop it"""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='entry_tombstones')
+    entry_id = models.BigIntegerField()
+    sync_version = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'sync_version'],
+                         name='tombstone_user_sync_idx'),
+        ]
+
+
+class Organization(models.Model):
+    """A company using Climatiqq; groups teams"""
+
+    name = models.CharField(max_length=200)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Team(models.Model):
+    organization = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, related_name='teams')
+    name = models.CharField(max_length=200)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.organization.name} / {self.name}"
+
+
+class TeamMembership(models.Model):
+    """A user's place in a team.
+
+    ``organization`` is copied from the team so the database can enforce one
+    team per user per organization, which keeps organization rollups (sums of
+    team totals) free of double counting.
+    """
+
+    ROLE_CHOICES = [
+        ('member', 'Member'),
+        ('manager', 'Manager'),
+    ]
+
+    team = models.ForeignKey(
+        Team, on_delete=models.CASCADE, related_name='memberships')
+    organization = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, related_name='memberships',
+        editable=False)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='team_memberships')
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='member')
+    joined_at = models.DateTimeField(auto_now_add=True)
+
+    # (team_id, user_id) as last loaded from or written to the database
+    saved_member = None
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['organization', 'user'], name='one_team_per_organization'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} in {self.team.name}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if 'team_id' in loaded and 'user_id' in loaded:
+            instance.saved_member = (loaded['team_id'], loaded['user_id'])
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.organization_id = self.team.organization_id
+        with transaction.atomic(using=kwargs.get('using')):
+            if self.pk is not None and self.saved_member is None:
+                self.saved_member = type(self).objects.filter(pk=self.pk).values_list(
+                    'team_id', 'user_id').first()
+            super().save(*args, **kwargs)
+        # post_save receivers see the previous member; refresh it afterwards
+        self.saved_member = (self.team_id, self.user_id)
+
+
+class MetricTotalBase(models.Model):
+    metric_type = MetricTypeField()
+    total_value = models.FloatField(default=0)
+    entry_count = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class UserMetricTotal(MetricTotalBase):
+    """Running all-time total per user and metric"""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='metric_totals')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'metric_type'], name='unique_user_metric_total'),
+        ]
+
+
+class UserDailyTotal(MetricTotalBase):
+    """Running total per user, day (UTC) and metric"""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='daily_totals')
+    day = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'day', 'metric_type'], name='unique_user_daily_total'),
+        ]
+
+
+class TeamMetricTotal(MetricTotalBase):
+    """Running all-time total per team and metric, summed from members"""
+
+    team = models.ForeignKey(
+        Team, on_delete=models.CASCADE, related_name='metric_totals')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['team', 'metric_type'], name='unique_team_metric_total'),
+        ]
+
+
+class TeamDailyTotal(MetricTotalBase):
+    """Running total per team, day (UTC) and metric"""
+
+    team = models.ForeignKey(
+        Team, on_delete=models.CASCADE, related_name='daily_totals')
+    day = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['team', 'day', 'metric_type'], name='unique_team_daily_total'),
+        ]
+
+
+class ActivityYear(models.Model):
+    """One bit per day of the year, set when the user logged any entry that day.
+
+    Bit ``n`` (little-endian) stands for day-of-year ``n + 1``, so a full year
+    fits in 46 bytes.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='activity_years')
+    year = models.PositiveSmallIntegerField()
+    bits = models.BinaryField(default=bytes)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'year'], name='unique_user_activity_year'),
+        ]
+
+    @property
+    def mask(self):
+        return int.from_bytes(bytes(self.bits), 'little')
+
+    @mask.setter
+    def mask(self, value):
+        self.bits = value.to_bytes((value.bit_length() + 7) // 8, 'little')
@@ -0,0 +1,166 @@
+"""Migration operations that stay online on PostgreSQL and still run on SQLite."""
+from django.db import migrations
+from django.db.models import Case, F, Max, Min, Value, When
+
+from .fields import METRIC_CODES
+
+
+class AddIndexOnline(migrations.AddIndex):
+    """AddIndex that builds with CONCURRENTLY on PostgreSQL.
+
+    Writes keep flowing during the build. Migrations using it must set
+    ``atomic = False``. A failed concurrent build leaves an invalid index
+    behind, so any index of the same name is dropped first and the migration
+    can simply be run again. Other backends fall back to a plain index build.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(
+                f'DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(self.index.name)}')
+            schema_editor.add_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.add_index(model, self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.remove_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.remove_index(model, self.index)
+
+
+class RunPostgresSQL(migrations.RunSQL):
+    """RunSQL that is skipped on every backend except PostgreSQL"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+# While code from before the storage redesign is still running it writes
+# only the ``metric_type`` slug; this trigger fills the new columns the way
+# the backfill does (installed in 0003, dropped in 0006)
+METRIC_CODE_TRIGGER_SQL = [
+    """CREATE OR REPLACE FUNCTION tracker_impactentry_fill_metric_code()
+    RETURNS trigger AS $$
+    BEGIN
+        NEW.metric_code := CASE NEW.metric_type %s ELSE NEW.metric_code END;
+        IF NEW.sync_version = 0 THEN
+            NEW.sync_version := NEW.id;
+        END IF;
+        NEW.description := NULLIF(NEW.description, '');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""" % ' '.join(
+        f"WHEN '{slug}' THEN {code}" for slug, code in METRIC_CODES.items()),
+    'DROP TRIGGER IF EXISTS tracker_impactentry_metric_code ON tracker_impactentry',
+    'CREATE TRIGGER tracker_impactentry_metric_code '
+    'BEFORE INSERT OR UPDATE ON tracker_impactentry '
+    'FOR EACH ROW EXECUTE FUNCTION tracker_impactentry_fill_metric_code()',
+]
+
+DROP_METRIC_CODE_TRIGGER_SQL = [
+    'DROP TRIGGER IF EXISTS tracker_impactentry_metric_code ON tracker_impactentry',
+    'DROP FUNCTION IF EXISTS tracker_impactentry_fill_metric_code()',
+]
+
+# A validated CHECK lets PostgreSQL 12+ SET NOT NULL without scanning the table
+METRIC_CODE_CHECK = 'impactentry_metric_code_not_null'
+ADD_METRIC_CODE_CHECK_SQL = [
+    f'ALTER TABLE tracker_impactentry DROP CONSTRAINT IF EXISTS {METRIC_CODE_CHECK}, '
+    f'ADD CONSTRAINT {METRIC_CODE_CHECK} CHECK (metric_code IS NOT NULL) NOT VALID',
+    f'ALTER TABLE tracker_impactentry VALIDATE CONSTRAINT {METRIC_CODE_CHECK}',
+]
+DROP_METRIC_CODE_CHECK_SQL = (
+    f'ALTER TABLE tracker_impactentry DROP CONSTRAINT IF EXISTS {METRIC_CODE_CHECK}')
+
+# Highest ImpactEntry id when the trigger went in. Rows up to it are
+# backfilled online in 0004; only newer ones need the locked catch-up in 0006
+STORAGE_MARK_TABLE = 'tracker_entry_storage_mark'
+
+
+def record_storage_mark(apps, schema_editor):
+    ImpactEntry = apps.get_model('tracker', 'ImpactEntry')
+    high = ImpactEntry.objects.aggregate(high=Max('id'))['high'] or 0
+    schema_editor.execute(f'DROP TABLE IF EXISTS {STORAGE_MARK_TABLE}')
+    schema_editor.execute(f'CREATE TABLE {STORAGE_MARK_TABLE} (max_id bigint NOT NULL)')
+    schema_editor.execute(
+        f'INSERT INTO {STORAGE_MARK_TABLE} (max_id) VALUES (%s)', params=[high])
+
+
+def drop_storage_mark(apps, schema_editor):
+    schema_editor.execute(f'DROP TABLE IF EXISTS {STORAGE_MARK_TABLE}')
+
+
+def _storage_mark(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT max_id FROM {STORAGE_MARK_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def backfill_entry_storage(apps, schema_editor, batch_size=10000, after=None):
+    """Fill the new ImpactEntry columns in id-range batches.
+
+    Each batch is its own short statement when the calling migration is
+    non-atomic, so no long-running lock is held. Only rows still needing
+    work are touched, which makes it safe to run again. ``after`` limits the
+    pass to ids above it.
+    """
+    ImpactEntry = apps.get_model('tracker', 'ImpactEntry')
+    rows = ImpactEntry.objects.all()
+    if after is not None:
+        rows = rows.filter(id__gt=after)
+    bounds = rows.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return
+
+    metric_code = Case(*[
+        When(metric_type=slug, then=Value(code)) for slug, code in METRIC_CODES.items()
+    ])
+    for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+        batch = ImpactEntry.objects.filter(id__gte=start, id__lt=start + batch_size)
+        batch.filter(metric_code__isnull=True).update(metric_code=metric_code)
+        # Versions only need to grow per user, so the id is a valid first version
+        batch.filter(sync_version=0).update(
+            sync_version=F('id'), updated_at=F('created_at'))
+        batch.filter(description='').update(description=None)
+
+
+def init_sync_state(apps, schema_editor, users=None):
+    """Start each user's sync counter after the versions given to their rows"""
+    ImpactEntry = apps.get_model('tracker', 'ImpactEntry')
+    SyncState = apps.get_model('tracker', 'SyncState')
+    entries = ImpactEntry.objects.all()
+    if users is not None:
+        entries = entries.filter(user_id__in=users)
+    latest = entries.values('user_id').annotate(version=Max('sync_version')).order_by()
+    SyncState.objects.bulk_create(
+        [SyncState(user_id=row['user_id'], version=row['version']) for row in latest],
+        update_conflicts=True, unique_fields=['user'], update_fields=['version'],
+        batch_size=1000,
+    )
+
+
+def catch_up_entry_storage(apps, schema_editor):
+    """Backfill and sync counters for rows written since ``record_storage_mark``.
+
+    Runs under the contract step's table lock, so it only reads the short id
+    range above the mark and the affected users' ``(user, sync_version)``
+    index ranges.
+    """
+    mark = _storage_mark(schema_editor)
+    backfill_entry_storage(apps, schema_editor, after=mark)
+    ImpactEntry = apps.get_model('tracker', 'ImpactEntry')
+    users = set(ImpactEntry.objects.filter(id__gt=mark).values_list('user_id', flat=True))
+    if users:
+        init_sync_state(apps, schema_editor, users=users)
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import ImpactEntry
+from .models import ImpactEntry, Team
 
 User = get_user_model()
 
@@ -45,11 +45,40 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
 
 class ImpactEntrySerializer(serializers.ModelSerializer):
+    """Entry serializer; pass ``fields=[...]`` to render a sparse fieldset"""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         model = ImpactEntry
-        fields = ['id', 'metric_type', 'value', 'description', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'metric_type', 'value', 'description', 'created_at',
+                  'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def validate_description(self, value):
+        # Empty descriptions are stored as NULL
+        return value or None
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if 'description' in data and data['description'] is None:
+            data['description'] = ''
+        return data
 
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
+
+
+class TeamSerializer(serializers.ModelSerializer):
+    organization_name = serializers.CharField(source='organization.name', read_only=True)
+
+    class Meta:
+        model = Team
+        fields = ['id', 'name', 'organization', 'organization_name']
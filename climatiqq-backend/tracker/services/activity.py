@@ -0,0 +1,104 @@
+from datetime import date, timedelta
+
+from django.utils import timezone
+
+from ..models import ActivityYear, UserDailyTotal
+
+
+def day_bit(day):
+    return 1 << (day.timetuple().tm_yday - 1)
+
+
+def set_day(user_id, day, active):
+    """Set or clear the bit for ``day``; call inside the entry's transaction"""
+    row, _ = ActivityYear.objects.select_for_update().get_or_create(
+        user_id=user_id, year=day.year)
+    mask = row.mask | day_bit(day) if active else row.mask & ~day_bit(day)
+    if mask != row.mask:
+        row.mask = mask
+        row.save(update_fields=['bits'])
+
+
+def mark_active(user_id, day):
+    # Most entries land on a day that is already marked; skip the row lock then
+    bits = ActivityYear.objects.filter(
+        user_id=user_id, year=day.year).values_list('bits', flat=True).first()
+    if bits is not None and int.from_bytes(bytes(bits), 'little') & day_bit(day):
+        return
+    set_day(user_id, day, True)
+
+
+def refresh_day(user_id, day):
+    """Clear the day's bit once its last entry is gone (uses the daily rollup)"""
+    still_active = UserDailyTotal.objects.filter(
+        user_id=user_id, day=day, entry_count__gt=0).exists()
+    set_day(user_id, day, still_active)
+
+
+def _combined_mask(user):
+    """All of the user's years as one int; bit 0 is Jan 1 of the first year"""
+    years = dict(ActivityYear.objects.filter(user=user).values_list('year', 'bits'))
+    if not years:
+        return None, 0
+
+    origin = date(min(years), 1, 1)
+    combined = 0
+    for year, bits in years.items():
+        offset = (date(year, 1, 1) - origin).days
+        combined |= int.from_bytes(bytes(bits), 'little') << offset
+    return origin, combined
+
+
+def _run_ending_at(mask, index):
+    """Length of the run of set bits ending at bit ``index``"""
+    if index < 0:
+        return 0
+    gaps = ~mask & ((1 << (index + 1)) - 1)
+    if not gaps:
+        return index + 1
+    return index - (gaps.bit_length() - 1)
+
+
+def _longest_run(mask):
+    # Each step shortens every run by one, so the step count is the longest run
+    length = 0
+    while mask:
+        mask &= mask >> 1
+        length += 1
+    return length
+
+
+def activity_summary(user, today=None):
+    """Streak and active-day figures computed from the activity bitmaps.
+
+    The current streak counts back from today, or from yesterday while today
+    has no entry yet, so a streak is not broken until a full day is missed.
+    """
+    today = today or timezone.localdate()
+    origin, mask = _combined_mask(user)
+    current_streak = longest_streak = active_days = 0
+
+    if origin is not None:
+        today_index = (today - origin).days
+        current_streak = _run_ending_at(mask, today_index)
+        if current_streak == 0:
+            current_streak = _run_ending_at(mask, today_index - 1)
+        longest_streak = _longest_run(mask)
+        offset = (date(today.year, 1, 1) - origin).days
+        year_days = (date(today.year + 1, 1, 1) - date(today.year, 1, 1)).days
+        if offset >= 0:
+            active_days = bin((mask >> offset) & ((1 << year_days) - 1)).count('1')
+
+    return {
+        'current_streak': current_streak,
+        'longest_streak': longest_streak,
+        'active_days_this_year': active_days,
+    }
+
+
+def active_dates(user, year):
+    row = ActivityYear.objects.filter(user=user, year=year).first()
+    mask = row.mask if row else 0
+    start = date(year, 1, 1)
+    return [start + timedelta(days=index)
+            for index in range(mask.bit_length()) if mask >> index & 1]
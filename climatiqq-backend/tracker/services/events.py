@@ -0,0 +1,146 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+RESYNC_EVENT = {'type': 'stats.resync'}
+
+
+class SubscriberLimitReached(Exception):
+    pass
+
+
+class Subscription:
+    """One event stream's mailbox, bound to the event loop that reads it"""
+
+    def __init__(self, user_id, loop, maxsize):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.closed = False
+
+    def offer(self, event):
+        # Runs on self.loop. A full mailbox means the client is not keeping
+        # up; deltas are relative, so dropping one would leave its totals
+        # wrong for good. Replace the backlog with a resync (refetch /stats/)
+        # and end the stream instead; EventSource reconnects on its own.
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.closed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_EVENT)
+
+    def close(self):
+        """Ask the stream to end; safe to call from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._wake_closed)
+        except RuntimeError:
+            # Loop already closed, so the stream is gone too
+            pass
+
+    def _wake_closed(self):
+        self.closed = True
+        while self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def get(self, timeout):
+        """Next event, or None once the subscription has been closed"""
+        if self.closed and self.queue.empty():
+            return None
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class InProcessBroker:
+    """Fan out events to subscribers living in this process.
+
+    Publishing is thread-safe and never blocks: events are handed to each
+    subscriber's event loop with ``call_soon_threadsafe``. An idle subscriber
+    is just an empty queue. A user at ``max_per_user`` streams has the oldest
+    one closed to make room: the server does not notice clients that went
+    away, so those are most likely abandoned tabs. Only streams served by the same process see the
+    events, so multi-process deployments should point ``EVENTS_BROKER`` at a
+    broker with the same interface backed by a shared channel.
+    """
+
+    def __init__(self, max_subscribers=10000, max_per_user=5, queue_size=100):
+        self.max_subscribers = max_subscribers
+        self.max_per_user = max_per_user
+        self.queue_size = queue_size
+        # user id -> {subscription: None}, oldest first
+        self._subscribers = defaultdict(dict)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = Subscription(
+            user_id, asyncio.get_running_loop(), self.queue_size)
+        evicted = []
+        with self._lock:
+            subscribers = self._subscribers[user_id]
+            while subscribers and len(subscribers) >= self.max_per_user:
+                oldest = next(iter(subscribers))
+                del subscribers[oldest]
+                self._count -= 1
+                evicted.append(oldest)
+            if self._count >= self.max_subscribers:
+                if not subscribers:
+                    del self._subscribers[user_id]
+                raise SubscriberLimitReached('Too many open event streams.')
+            subscribers[subscription] = None
+            self._count += 1
+        for oldest in evicted:
+            oldest.close()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers and subscription in subscribers:
+                del subscribers[subscription]
+                self._count -= 1
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # Loop already closed; the stream's cleanup will unsubscribe
+                pass
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_class = import_string(getattr(
+                    settings, 'EVENTS_BROKER',
+                    'tracker.services.events.InProcessBroker'))
+                _broker = broker_class(
+                    max_subscribers=getattr(settings, 'EVENTS_MAX_SUBSCRIBERS', 10000),
+                    max_per_user=getattr(settings, 'EVENTS_MAX_PER_USER', 5),
+                    queue_size=getattr(settings, 'EVENTS_QUEUE_SIZE', 100),
+                )
+    return _broker
+
+
+def publish_on_commit(user_id, event):
+    """Publish once the surrounding transaction commits (immediately outside one)"""
+    transaction.on_commit(lambda: get_broker().publish(user_id, event))
@@ -0,0 +1,197 @@
+"""Per-metric end-of-month and end-of-year projections from daily rollups.
+
+Each user's recent ``UserDailyTotal`` rows are laid out as one
+``(users, metrics, days)`` array and all series are fitted at once: a least
+squares trend line, a day-of-week adjustment from its residuals and a
+trailing moving average. Fitted parameters are cached under the user's sync
+version, which every entry create, update and delete bumps, so a new entry
+invalidates the cached fit without an explicit delete.
+
+NumPy is imported inside the functions that use it so that loading the
+views (on a worker's first request) does not pay for it.
+"""
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+
+from ..fields import METRIC_CODES
+from ..models import SyncState, UserDailyTotal
+
+METRICS = list(METRIC_CODES)
+HISTORY_DAYS = 90
+MOVING_AVERAGE_DAYS = 7
+CACHE_SECONDS = 24 * 60 * 60
+
+
+def cache_key(user_id, today, version):
+    return f'forecast:{user_id}:{today.isoformat()}:{version}'
+
+
+def load_daily(user_ids, start, today):
+    """Daily totals as a ``(users, metrics, days)`` array; the last day is ``today``"""
+    import numpy as np
+
+    index = {user_id: i for i, user_id in enumerate(user_ids)}
+    totals = np.zeros((len(user_ids), len(METRICS), (today - start).days + 1))
+    rows = UserDailyTotal.objects.filter(
+        user_id__in=user_ids, day__gte=start, day__lte=today,
+    ).values_list('user_id', 'metric_type', 'day', 'total_value')
+
+    users, metrics, days, values = [], [], [], []
+    for user_id, metric, day, value in rows.iterator(chunk_size=5000):
+        users.append(index[user_id])
+        metrics.append(METRIC_CODES[metric] - 1)
+        days.append((day - start).days)
+        values.append(value)
+    totals[users, metrics, days] = values
+    return totals
+
+
+def fit(history, start):
+    """Fit every series in ``history`` (``(..., days)``) at once.
+
+    A series is fitted from its first non-zero day on, so a user who joined
+    last week is not dragged towards zero by the weeks before. Returns
+    arrays shaped like ``history`` minus its last axis (plus a trailing 7 for
+    ``weekly``, indexed by ``date.weekday()``).
+    """
+    import numpy as np
+
+    days = history.shape[-1]
+    x = np.arange(days, dtype=float)
+    active = history != 0
+    first = np.where(active.any(axis=-1), active.argmax(axis=-1), days)
+    weights = (x >= first[..., None]).astype(float)
+
+    n = weights.sum(axis=-1)
+    sx = weights @ x
+    sy = (weights * history).sum(axis=-1)
+    sxx = weights @ (x * x)
+    sxy = (weights * history) @ x
+    denom = n * sxx - sx * sx
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(denom > 0, (n * sxy - sx * sy) / denom, 0.0)
+        intercept = np.where(n > 0, (sy - slope * sx) / n, 0.0)
+
+        # Mean residual per weekday; one_hot[d, k] is 1 when day d is weekday k
+        residual = (history - (intercept[..., None] + slope[..., None] * x)) * weights
+        one_hot = np.zeros((days, 7))
+        one_hot[np.arange(days), (start.weekday() + np.arange(days)) % 7] = 1
+        counts = weights @ one_hot
+        weekly = np.where(counts > 0, (residual @ one_hot) / counts, 0.0)
+
+    return {
+        'slope': slope,
+        'intercept': intercept,
+        'weekly': weekly,
+        'moving_average': history[..., -MOVING_AVERAGE_DAYS:].mean(axis=-1),
+        'days_fitted': n,
+    }
+
+
+def fit_users(user_ids, today=None):
+    """Fitted parameters and to-date totals for ``user_ids``, keyed by user id.
+
+    Costs two queries however many users are passed, so batch callers should
+    hand over users in large chunks.
+    """
+    today = today or timezone.localdate()
+    start = today - timedelta(days=HISTORY_DAYS)
+    year_start = date(today.year, 1, 1)
+
+    daily = load_daily(user_ids, start, today)
+    params = fit(daily[..., :-1], start)
+    month_to_date = daily[..., (today.replace(day=1) - start).days:].sum(axis=-1)
+
+    year_to_date = {}
+    for row in UserDailyTotal.objects.filter(
+            user_id__in=user_ids, day__gte=year_start, day__lte=today,
+    ).values('user_id', 'metric_type').annotate(total=Sum('total_value')).order_by():
+        year_to_date[row['user_id'], row['metric_type']] = row['total']
+
+    fitted = {}
+    for i, user_id in enumerate(user_ids):
+        fitted[user_id] = {
+            metric: {
+                'slope': float(params['slope'][i, m]),
+                'intercept': float(params['intercept'][i, m]),
+                'weekly': params['weekly'][i, m].tolist(),
+                'moving_average': float(params['moving_average'][i, m]),
+                'days_fitted': int(params['days_fitted'][i, m]),
+                'today': float(daily[i, m, -1]),
+                'month_to_date': float(month_to_date[i, m]),
+                'year_to_date': year_to_date.get((user_id, metric), 0.0),
+            }
+            for m, metric in enumerate(METRICS)
+        }
+    return fitted
+
+
+def project(params, today):
+    """Project one user's fitted parameters to the end of the month and year"""
+    import numpy as np
+
+    month_end = (today.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    year_end = date(today.year, 12, 31)
+    ahead = np.arange((year_end - today).days + 1)
+    x = HISTORY_DAYS + ahead
+    weekday = (today.weekday() + ahead) % 7
+    month_days = (month_end - today).days + 1
+
+    result = {}
+    for metric, p in params.items():
+        if not p['days_fitted'] and not p['year_to_date']:
+            continue
+        # Forecast for today onwards; today's forecast only counts where it
+        # exceeds what has been logged so far
+        trend = np.clip(p['intercept'] + p['slope'] * x + np.asarray(p['weekly'])[weekday], 0, None)
+        trend[0] = max(trend[0] - p['today'], 0)
+        average = np.full(len(ahead), p['moving_average'])
+        average[0] = max(average[0] - p['today'], 0)
+
+        result[metric] = {
+            'month_to_date': p['month_to_date'],
+            'year_to_date': p['year_to_date'],
+            'daily_trend': p['slope'],
+            'moving_average': p['moving_average'],
+            'end_of_month': {
+                'trend': p['month_to_date'] + float(trend[:month_days].sum()),
+                'moving_average': p['month_to_date'] + float(average[:month_days].sum()),
+            },
+            'end_of_year': {
+                'trend': p['year_to_date'] + float(trend.sum()),
+                'moving_average': p['year_to_date'] + float(average.sum()),
+            },
+        }
+    return result
+
+
+def _versions(user_ids):
+    versions = dict(SyncState.objects.filter(
+        user_id__in=user_ids).values_list('user_id', 'version'))
+    return {user_id: versions.get(user_id, 0) for user_id in user_ids}
+
+
+def warm(user_ids, today=None):
+    """Fit ``user_ids`` in one pass and cache the results; returns the fits"""
+    today = today or timezone.localdate()
+    versions = _versions(user_ids)
+    fitted = fit_users(user_ids, today)
+    cache.set_many({
+        cache_key(user_id, today, versions[user_id]): params
+        for user_id, params in fitted.items()
+    }, CACHE_SECONDS)
+    return fitted
+
+
+def forecast_for(user, today=None):
+    today = today or timezone.localdate()
+    key = cache_key(user.pk, today, _versions([user.pk])[user.pk])
+    params = cache.get(key)
+    if params is None:
+        params = fit_users([user.pk], today)[user.pk]
+        cache.set(key, params, CACHE_SECONDS)
+    return project(params, today)
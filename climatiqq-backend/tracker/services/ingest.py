@@ -0,0 +1,167 @@
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, router, transaction
+from django.utils import timezone
+
+from ..models import ImpactEntry, SyncState
+from ..signals import metric_deltas, publish_stats_delta
+from . import activity, rollups
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFull(Exception):
+    pass
+
+
+class FlushTimeout(Exception):
+    pass
+
+
+class PendingWrite:
+    __slots__ = ('entry', 'done', 'error')
+
+    def __init__(self, entry):
+        self.entry = entry
+        self.done = threading.Event()
+        self.error = None
+
+
+def write_entries(entries):
+    """Insert ``entries`` with one multi-row INSERT in one transaction.
+
+    Covers what ``ImpactEntry.save()`` and its signal receivers would do, but
+    once per batch instead of per row. Sync versions are reserved once per
+    user. Rollup changes are summed in memory and applied in the same fixed
+    order as every other writer, so team rows are locked once and in order.
+    Live events go out after the commit. ``post_save`` is not sent.
+    """
+    using = router.db_for_write(ImpactEntry)
+    by_user = defaultdict(list)
+    for entry in entries:
+        by_user[entry.user_id].append(entry)
+
+    with transaction.atomic(using=using):
+        # Lock users in a fixed order so concurrent flushes cannot deadlock
+        for user_id in sorted(by_user):
+            user_entries = by_user[user_id]
+            first = SyncState.allocate(user_id, len(user_entries)) - len(user_entries) + 1
+            for offset, entry in enumerate(user_entries):
+                entry.sync_version = first + offset
+
+        ImpactEntry.objects.using(using).bulk_create(entries)
+
+        deltas = defaultdict(lambda: [0.0, 0])
+        active_days = set()
+        for entry in entries:
+            day = timezone.localdate(entry.created_at)
+            deltas[entry.user_id, day, entry.metric_type][0] += entry.value
+            deltas[entry.user_id, day, entry.metric_type][1] += 1
+            active_days.add((entry.user_id, day))
+            entry.saved_state = (entry.metric_type, entry.value)
+
+        rollups.apply_deltas(deltas)
+        for user_id, day in sorted(active_days):
+            activity.mark_active(user_id, day)
+        for entry in entries:
+            publish_stats_delta(
+                entry, 'created', metric_deltas(None, (entry.metric_type, entry.value)))
+
+
+class GroupCommitBuffer:
+    """Coalesce single-entry creates from many requests into group commits.
+
+    Request threads enqueue an unsaved entry and block until a background
+    thread has committed it. The flusher gathers up to ``max_batch`` entries
+    or waits at most ``max_delay`` seconds after the first one, then writes
+    them all in a single transaction. When ``max_pending`` entries are
+    already waiting, ``submit`` fails fast with ``BufferFull`` instead of
+    queueing more work. This pays off with threaded WSGI workers, where many
+    request threads can wait on the same flush.
+    """
+
+    def __init__(self, max_batch=100, max_delay=0.005, max_pending=1000):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pending = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, entry, timeout=5):
+        """Queue ``entry`` and return it once its batch has committed"""
+        self._ensure_started()
+        write = PendingWrite(entry)
+        try:
+            self.pending.put_nowait(write)
+        except queue.Full:
+            raise BufferFull('Too many writes are waiting to be committed.')
+
+        if not write.done.wait(timeout):
+            # The write is still queued and may yet commit
+            raise FlushTimeout('The write was not committed in time.')
+        if write.error is not None:
+            raise write.error
+        return write.entry
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='entry-group-commit', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch):
+        close_old_connections()
+        try:
+            write_entries([write.entry for write in batch])
+        except Exception:
+            # One bad row must not fail its neighbours: retry each on its own
+            logger.exception('Group commit of %d entries failed; retrying singly', len(batch))
+            for write in batch:
+                write.entry.pk = None
+                write.entry._state.adding = True
+                try:
+                    write_entries([write.entry])
+                except Exception as exc:
+                    write.error = exc
+        finally:
+            for write in batch:
+                write.done.set()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = GroupCommitBuffer(
+                    max_batch=settings.INGEST_MAX_BATCH,
+                    max_delay=settings.INGEST_MAX_DELAY_MS / 1000,
+                    max_pending=settings.INGEST_MAX_PENDING,
+                )
+    return _buffer
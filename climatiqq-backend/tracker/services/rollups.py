@@ -0,0 +1,100 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from ..models import (
+    TeamDailyTotal, TeamMembership, TeamMetricTotal, UserDailyTotal, UserMetricTotal,
+)
+
+
+def bump(model, key, value, count):
+    """Add ``value``/``count`` to the rollup row identified by ``key``, creating it if needed"""
+    changes = {
+        'total_value': F('total_value') + value,
+        'entry_count': F('entry_count') + count,
+    }
+    if model.objects.filter(**key).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(total_value=value, entry_count=count, **key)
+    except IntegrityError:
+        # Another writer created the row first
+        model.objects.filter(**key).update(**changes)
+
+
+def apply_entry_deltas(user_id, day, deltas):
+    """Fold an entry change into the user's totals and those of their teams.
+
+    ``deltas`` maps metric type to ``(value_delta, count_delta)``. The cost is
+    a handful of single-row updates per team the user belongs to.
+    """
+    apply_deltas({
+        (user_id, day, metric): delta for metric, delta in deltas.items()
+    })
+
+
+def apply_deltas(deltas):
+    """Fold many entry changes into user and team rollups in one pass.
+
+    ``deltas`` maps ``(user_id, day, metric_type)`` to ``(value_delta,
+    count_delta)``. Changes to the same rollup row are summed first, so each
+    row is updated once. Rows are then updated table by table in sorted key
+    order. Every writer locks rollup rows in that same order, so concurrent
+    writers cannot deadlock.
+    """
+    if not deltas:
+        return
+
+    user_totals = defaultdict(lambda: [0.0, 0])
+    user_daily = defaultdict(lambda: [0.0, 0])
+    for (user_id, day, metric), (value, count) in deltas.items():
+        for row in (user_totals[user_id, metric], user_daily[user_id, day, metric]):
+            row[0] += value
+            row[1] += count
+
+    teams = defaultdict(list)
+    for user_id, team_id in TeamMembership.objects.filter(
+            user_id__in={user_id for user_id, _, _ in deltas}).values_list('user_id', 'team_id'):
+        teams[user_id].append(team_id)
+
+    team_totals = defaultdict(lambda: [0.0, 0])
+    team_daily = defaultdict(lambda: [0.0, 0])
+    for (user_id, day, metric), (value, count) in deltas.items():
+        for team_id in teams[user_id]:
+            for row in (team_totals[team_id, metric], team_daily[team_id, day, metric]):
+                row[0] += value
+                row[1] += count
+
+    for model, fields, rows in (
+        (UserMetricTotal, ('user_id', 'metric_type'), user_totals),
+        (UserDailyTotal, ('user_id', 'day', 'metric_type'), user_daily),
+        (TeamMetricTotal, ('team_id', 'metric_type'), team_totals),
+        (TeamDailyTotal, ('team_id', 'day', 'metric_type'), team_daily),
+    ):
+        for key in sorted(rows):
+            value, count = rows[key]
+            if value or count:
+                bump(model, dict(zip(fields, key)), value, count)
+
+
+def shift_member_totals(team_id, user_id, sign):
+    """Add (sign=1) or remove (sign=-1) a member's totals from a team's rollups"""
+    totals = UserMetricTotal.objects.filter(user_id=user_id).order_by(
+        'metric_type').values_list('metric_type', 'total_value', 'entry_count')
+    for metric, value, count in totals:
+        bump(TeamMetricTotal, {'team_id': team_id, 'metric_type': metric},
+             sign * value, sign * count)
+
+    daily = UserDailyTotal.objects.filter(user_id=user_id).order_by(
+        'day', 'metric_type').values_list('day', 'metric_type', 'total_value', 'entry_count')
+    for day, metric, value, count in daily:
+        bump(TeamDailyTotal, {'team_id': team_id, 'day': day, 'metric_type': metric},
+             sign * value, sign * count)
+
+
+def remove_user_from_team_totals(user_id):
+    for team_id in TeamMembership.objects.filter(user_id=user_id).order_by(
+            'team_id').values_list('team_id', flat=True):
+        shift_member_totals(team_id, user_id, -1)
@@ -0,0 +1,127 @@
+"""Full-text search over ImpactEntry descriptions.
+
+Each backend uses its own index:
+
+* PostgreSQL: a ``btree_gin`` index on ``(user_id, to_tsvector(description))``
+  built concurrently by migration 0008 and maintained by Postgres itself.
+* SQLite: an external-content FTS5 table kept in step by triggers, installed
+  after ``migrate`` because rebuilding the entry table drops the triggers.
+
+Other backends, or SQLite builds without FTS5, fall back to ``icontains``.
+"""
+from django.db import connection
+
+from ..models import ImpactEntry
+
+TABLE = ImpactEntry._meta.db_table
+FTS_TABLE = f'{TABLE}_fts'
+TS_CONFIG = 'english'
+# Must match the expression indexed in migration 0008
+TS_VECTOR = f"to_tsvector('{TS_CONFIG}', coalesce(description, ''))"
+
+SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description)
+        VALUES ('delete', old.id, old.description);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF description ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description)
+        VALUES ('delete', old.id, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, description) VALUES (new.id, new.description);
+    END""",
+]
+
+
+def _sqlite_has_fts5(cursor):
+    cursor.execute('PRAGMA compile_options')
+    return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def backend():
+    """Return 'postgresql', 'fts5' or 'fallback' for the default connection"""
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            if _sqlite_has_fts5(cursor):
+                return 'fts5'
+    return 'fallback'
+
+
+def install_search_index(using=None, **kwargs):
+    """Create the SQLite FTS5 table if missing; safe to run after every migrate.
+
+    Rebuilding the entry table during a migration drops its triggers, so the
+    FTS table is rebuilt whenever they have to be recreated. PostgreSQL's
+    index comes from migration 0008.
+    """
+    if backend() != 'fts5':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"description, content='{TABLE}', content_rowid='id', "
+            f"tokenize='porter unicode61')"
+        )
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+            [f'{FTS_TABLE}_%'],
+        )
+        if cursor.fetchone()[0] == len(SQLITE_TRIGGERS):
+            return
+        for name in ('ai', 'ad', 'au'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{name}')
+        for statement in SQLITE_TRIGGERS:
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def _fts5_query(text):
+    # Quote every term so user input can never be read as FTS5 syntax
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in text.split())
+
+
+def search_entry_ids(user, text, limit=20, offset=0):
+    """Return the ids of the user's entries matching ``text``, best match first"""
+    kind = backend()
+
+    if kind == 'fallback':
+        return list(
+            ImpactEntry.objects.filter(user=user, description__icontains=text)
+            .order_by('-created_at')
+            .values_list('id', flat=True)[offset:offset + limit]
+        )
+
+    if kind == 'postgresql':
+        sql = f"""
+            SELECT id FROM {TABLE}
+            WHERE user_id = %s
+              AND {TS_VECTOR} @@ websearch_to_tsquery('{TS_CONFIG}', %s)
+            ORDER BY ts_rank({TS_VECTOR}, websearch_to_tsquery('{TS_CONFIG}', %s)) DESC,
+                     id DESC
+            LIMIT %s OFFSET %s
+        """
+        params = [user.pk, text, text, limit, offset]
+    else:
+        sql = f"""
+            SELECT e.id FROM {FTS_TABLE} f
+            JOIN {TABLE} e ON e.id = f.rowid
+            WHERE f.{FTS_TABLE} MATCH %s AND e.user_id = %s
+            ORDER BY bm25({FTS_TABLE}), e.id DESC
+            LIMIT %s OFFSET %s
+        """
+        params = [_fts5_query(text), user.pk, limit, offset]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_entries(user, text, limit=20, offset=0):
+    ids = search_entry_ids(user, text, limit=limit, offset=offset)
+    entries = ImpactEntry.objects.in_bulk(ids)
+    return [entries[pk] for pk in ids if pk in entries]
@@ -0,0 +1,34 @@
+from ..models import ImpactEntry, EntryTombstone
+
+
+def changes_since(user, since=0, limit=500):
+    """Return the user's entry changes with a sync version above ``since``.
+
+    Upserts and tombstones are each read from a ``(user, sync_version)`` index
+    and merged in version order, so the cost tracks the number of changes and
+    not the size of the user's history. Returns ``(entries, deleted_ids,
+    next_token, has_more)``; ``next_token`` is the version of the last change
+    included and should be sent back as ``since`` on the next call.
+    """
+    entries = list(
+        ImpactEntry.objects.filter(user=user, sync_version__gt=since)
+        .order_by('sync_version')[:limit + 1]
+    )
+    tombstones = list(
+        EntryTombstone.objects.filter(user=user, sync_version__gt=since)
+        .order_by('sync_version')
+        .values_list('sync_version', 'entry_id')[:limit + 1]
+    )
+
+    changes = sorted(
+        [(entry.sync_version, entry, None) for entry in entries]
+        + [(version, None, entry_id) for version, entry_id in tombstones],
+        key=lambda change: change[0],
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    next_token = changes[-1][0] if changes else since
+    upserts = [entry for _, entry, _ in changes if entry is not None]
+    deleted_ids = [entry_id for _, _, entry_id in changes if entry_id is not None]
+    return upserts, deleted_ids, next_token, has_more
@@ -0,0 +1,114 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    ImpactEntry, EntryTombstone, Organization, SyncState, Team, TeamMembership,
+)
+from .services import activity, rollups
+from .services.events import publish_on_commit
+
+User = get_user_model()
+
+
+def metric_deltas(before, after):
+    """Per-metric ``[value_delta, count_delta]`` between two entry states.
+
+    Each state is a ``(metric_type, value)`` tuple, or None when the entry
+    does not exist on that side of the change.
+    """
+    deltas = defaultdict(lambda: [0.0, 0])
+    if before is not None and before[0] is not None:
+        deltas[before[0]][0] -= before[1]
+        deltas[before[0]][1] -= 1
+    if after is not None:
+        deltas[after[0]][0] += after[1]
+        deltas[after[0]][1] += 1
+    return {metric: delta for metric, delta in deltas.items() if delta != [0.0, 0]}
+
+
+def publish_stats_delta(instance, action, deltas):
+    if not deltas:
+        return
+    publish_on_commit(instance.user_id, {
+        'type': 'stats.delta',
+        'action': action,
+        'entry_id': instance.pk,
+        'sync_token': str(instance.sync_version),
+        'metrics': {
+            metric: {'total_value': value, 'count': count}
+            for metric, (value, count) in deltas.items()
+        },
+    })
+
+
+@receiver(post_save, sender=ImpactEntry)
+def entry_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    before = None if created else instance.saved_state
+    after = (instance.metric_type, instance.value)
+    deltas = metric_deltas(before, after)
+    day = timezone.localdate(instance.created_at)
+    rollups.apply_entry_deltas(instance.user_id, day, deltas)
+    if created:
+        activity.mark_active(instance.user_id, day)
+    publish_stats_delta(instance, 'created' if created else 'updated', deltas)
+
+
+@receiver(post_delete, sender=ImpactEntry)
+def entry_deleted(sender, instance, origin=None, **kwargs):
+    # Entries removed along with their owner have nobody left to sync to,
+    # and the owner's rollups go with them (see user_deleting)
+    if isinstance(origin, User):
+        return
+
+    instance.sync_version = SyncState.allocate(instance.user_id)
+    EntryTombstone.objects.create(
+        user_id=instance.user_id,
+        entry_id=instance.pk,
+        sync_version=instance.sync_version,
+    )
+    deltas = metric_deltas((instance.metric_type, instance.value), None)
+    day = timezone.localdate(instance.created_at)
+    rollups.apply_entry_deltas(instance.user_id, day, deltas)
+    activity.refresh_day(instance.user_id, day)
+    publish_stats_delta(instance, 'deleted', deltas)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    # Take the user's contribution out of their teams while it still exists
+    rollups.remove_user_from_team_totals(instance.pk)
+
+
+@receiver(post_save, sender=TeamMembership)
+def membership_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    # A membership moved to another user or team (e.g. in the admin) takes
+    # the old member's totals out before adding the new one's
+    before = None if created else instance.saved_member
+    after = (instance.team_id, instance.user_id)
+    if before == after:
+        return
+    # Runs inside TeamMembership.save()'s transaction. Wait for entry writers
+    # of the members so their totals are read after those writes land.
+    SyncState.lock(*(member[1] for member in (before, after) if member is not None))
+    if before is not None:
+        rollups.shift_member_totals(*before, -1)
+    rollups.shift_member_totals(*after, 1)
+
+
+@receiver(post_delete, sender=TeamMembership)
+def membership_deleted(sender, instance, origin=None, **kwargs):
+    # Removed with its user (already handled) or its team (rollups go too)
+    if isinstance(origin, (User, Team, Organization)):
+        return
+    SyncState.lock(instance.user_id)
+    rollups.shift_member_totals(instance.team_id, instance.user_id, -1)
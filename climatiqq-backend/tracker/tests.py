@@ -0,0 +1,395 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .models import (
+    EntryTombstone, ImpactEntry, Organization, SyncState, Team, TeamMembership,
+    TeamDailyTotal, TeamMetricTotal, UserDailyTotal, UserMetricTotal,
+)
+from . import middleware
+from .services import activity, events, forecast, ingest, search, sync
+from .throttling import TokenBucketStore, default_store, parse_rate
+from .tokens import StreamToken
+from .views import _authenticate_stream
+
+User = get_user_model()
+
+
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('sync', password='secret-pass')
+
+    def add(self, value=1.0, metric_type='carbon'):
+        return ImpactEntry.objects.create(
+            user=self.user, metric_type=metric_type, value=value)
+
+    def test_changes_page_in_version_order(self):
+        entries = [self.add(value=i) for i in range(5)]
+
+        first, deleted, token, has_more = sync.changes_since(self.user, since=0, limit=3)
+        self.assertEqual([e.pk for e in first], [e.pk for e in entries[:3]])
+        self.assertEqual(deleted, [])
+        self.assertTrue(has_more)
+
+        rest, _, token, has_more = sync.changes_since(self.user, since=token, limit=3)
+        self.assertEqual([e.pk for e in rest], [e.pk for e in entries[3:]])
+        self.assertFalse(has_more)
+
+        empty, _, same_token, has_more = sync.changes_since(self.user, since=token)
+        self.assertEqual((empty, same_token, has_more), ([], token, False))
+
+    def test_delete_leaves_tombstone(self):
+        entry = self.add()
+        _, _, token, _ = sync.changes_since(self.user)
+        entry_id = entry.pk
+        entry.delete()
+
+        tombstone = EntryTombstone.objects.get(entry_id=entry_id)
+        self.assertEqual(tombstone.sync_version, SyncState.objects.get(user=self.user).version)
+        entries, deleted, next_token, _ = sync.changes_since(self.user, since=token)
+        self.assertEqual((entries, deleted), ([], [entry_id]))
+        self.assertEqual(next_token, tombstone.sync_version)
+
+    def test_partial_save_is_synced(self):
+        entry = self.add()
+        _, _, token, _ = sync.changes_since(self.user)
+
+        entry.description = 'bike to work'
+        entry.save(update_fields=['description'])
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.sync_version, SyncState.objects.get(user=self.user).version)
+        changed, _, _, _ = sync.changes_since(self.user, since=token)
+        self.assertEqual([e.pk for e in changed], [entry.pk])
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('rollup', password='secret-pass')
+
+    def total(self, metric_type):
+        row = UserMetricTotal.objects.get(user=self.user, metric_type=metric_type)
+        return row.total_value, row.entry_count
+
+    def test_saving_deferred_entry_keeps_totals(self):
+        entry = ImpactEntry.objects.create(user=self.user, metric_type='water', value=4)
+        ImpactEntry.objects.create(user=self.user, metric_type='water', value=7)
+
+        partial = ImpactEntry.objects.only('id', 'description').get(pk=entry.pk)
+        partial.description = 'shorter shower'
+        partial.save()
+
+        self.assertEqual(self.total('water'), (11.0, 2))
+        entry.refresh_from_db()
+        self.assertEqual(entry.description, 'shorter shower')
+        self.assertEqual(entry.sync_version, SyncState.objects.get(user=self.user).version)
+
+    def test_reassigned_membership_moves_totals(self):
+        other = User.objects.create_user('other', password='secret-pass')
+        ImpactEntry.objects.create(user=self.user, metric_type='carbon', value=5)
+        ImpactEntry.objects.create(user=other, metric_type='carbon', value=2)
+        team = Team.objects.create(
+            organization=Organization.objects.create(name='Acme'), name='Ops')
+        membership = TeamMembership.objects.create(team=team, user=self.user)
+
+        membership = TeamMembership.objects.get(pk=membership.pk)
+        membership.user = other
+        membership.save()
+
+        total = TeamMetricTotal.objects.get(team=team, metric_type='carbon')
+        self.assertEqual((total.total_value, total.entry_count), (2.0, 1))
+
+
+    def test_group_commit_matches_single_saves(self):
+        other = User.objects.create_user('other', password='secret-pass')
+        team = Team.objects.create(
+            organization=Organization.objects.create(name='Acme'), name='Ops')
+        TeamMembership.objects.create(team=team, user=self.user)
+        TeamMembership.objects.create(team=team, user=other)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            ingest.write_entries([
+                ImpactEntry(user=self.user, metric_type='water', value=3),
+                ImpactEntry(user=other, metric_type='carbon', value=1),
+                ImpactEntry(user=self.user, metric_type='water', value=4),
+            ])
+
+        self.assertEqual(self.total('water'), (7.0, 2))
+        team_water = TeamMetricTotal.objects.get(team=team, metric_type='water')
+        self.assertEqual((team_water.total_value, team_water.entry_count), (7.0, 2))
+        self.assertEqual(TeamDailyTotal.objects.filter(team=team).count(), 2)
+        self.assertEqual(
+            sorted(ImpactEntry.objects.filter(user=self.user).values_list(
+                'sync_version', flat=True)), [1, 2])
+        self.assertEqual(len(callbacks), 3)
+
+
+@override_settings(INGEST_GROUP_COMMIT=True)
+class IngestViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('ingest', password='secret-pass'))
+
+    def post_with(self, error):
+        buffer = mock.Mock()
+        buffer.submit.side_effect = error
+        with mock.patch.object(ingest, 'get_buffer', return_value=buffer):
+            return self.client.post(
+                '/api/v1/entries/', {'metric_type': 'water', 'value': 3}, format='json')
+
+    def test_full_buffer_asks_client_to_retry(self):
+        response = self.post_with(ingest.BufferFull())
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_unconfirmed_write_is_pending_not_retryable(self):
+        response = self.post_with(ingest.FlushTimeout())
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertNotIn('Retry-After', response)
+
+
+class ActivityTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('streak', password='secret-pass')
+
+    def log_on(self, day):
+        noon = datetime(day.year, day.month, day.day, 12, tzinfo=dt_timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=noon):
+            return ImpactEntry.objects.create(user=self.user, metric_type='carbon', value=1)
+
+    def test_run_helpers(self):
+        self.assertEqual(activity._run_ending_at(0b0111, 2), 3)
+        self.assertEqual(activity._run_ending_at(0b1101, 3), 2)
+        self.assertEqual(activity._run_ending_at(0b0111, 3), 0)
+        self.assertEqual(activity._run_ending_at(0b0111, -1), 0)
+        self.assertEqual(activity._longest_run(0), 0)
+        self.assertEqual(activity._longest_run(0b111001111), 4)
+
+    def test_streak_crosses_year_boundary(self):
+        for day in (date(2025, 12, 30), date(2025, 12, 31), date(2026, 1, 1), date(2026, 1, 2)):
+            self.log_on(day)
+
+        summary = activity.activity_summary(self.user, today=date(2026, 1, 2))
+        self.assertEqual(summary, {
+            'current_streak': 4, 'longest_streak': 4, 'active_days_this_year': 2})
+        # Today without an entry yet does not break the streak; a missed day does
+        self.assertEqual(
+            activity.activity_summary(self.user, today=date(2026, 1, 3))['current_streak'], 4)
+        self.assertEqual(
+            activity.activity_summary(self.user, today=date(2026, 1, 4))['current_streak'], 0)
+        # 2025 has 365 days; Jan 1 2026 is not counted towards it
+        self.assertEqual(activity.activity_summary(
+            self.user, today=date(2025, 12, 31))['active_days_this_year'], 2)
+
+    def test_leap_day_and_year_end(self):
+        for day in (date(2024, 2, 28), date(2024, 2, 29), date(2024, 12, 31), date(2025, 1, 1)):
+            self.log_on(day)
+
+        self.assertEqual(activity.active_dates(self.user, 2024),
+                         [date(2024, 2, 28), date(2024, 2, 29), date(2024, 12, 31)])
+        summary = activity.activity_summary(self.user, today=date(2025, 1, 1))
+        self.assertEqual(summary['current_streak'], 2)
+        self.assertEqual(summary['longest_streak'], 2)
+        self.assertEqual(summary['active_days_this_year'], 1)
+
+    def test_deleting_last_entry_clears_day(self):
+        first = self.log_on(date(2026, 3, 1))
+        second = self.log_on(date(2026, 3, 1))
+        self.log_on(date(2026, 3, 2))
+
+        first.delete()
+        self.assertEqual(activity.active_dates(self.user, 2026),
+                         [date(2026, 3, 1), date(2026, 3, 2)])
+        second.delete()
+        self.assertEqual(activity.active_dates(self.user, 2026), [date(2026, 3, 2)])
+        summary = activity.activity_summary(self.user, today=date(2026, 3, 2))
+        self.assertEqual((summary['current_streak'], summary['longest_streak']), (1, 1))
+
+
+class ForecastTests(TestCase):
+    today = date(2026, 3, 10)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('forecast', password='secret-pass')
+
+    def test_constant_days_project_linearly(self):
+        daily = 2.5
+        UserDailyTotal.objects.bulk_create([
+            UserDailyTotal(user=self.user, day=self.today - timedelta(days=n),
+                           metric_type='water', total_value=daily, entry_count=1)
+            for n in range(1, forecast.HISTORY_DAYS + 1)
+        ])
+
+        result = forecast.forecast_for(self.user, today=self.today)['water']
+        # Mar 1-9 logged; Mar 10-31 (22 days, today included) still to come
+        self.assertAlmostEqual(result['month_to_date'], 9 * daily)
+        self.assertAlmostEqual(result['daily_trend'], 0)
+        for method in ('trend', 'moving_average'):
+            self.assertAlmostEqual(
+                result['end_of_month'][method], result['month_to_date'] + 22 * daily)
+        self.assertNotIn('carbon', forecast.forecast_for(self.user, today=self.today))
+
+    def test_new_entry_changes_cache_key(self):
+        def current_key():
+            version = SyncState.objects.filter(user=self.user).values_list(
+                'version', flat=True).first() or 0
+            return forecast.cache_key(self.user.pk, self.today, version)
+
+        before = current_key()
+        self.assertNotIn('water', forecast.forecast_for(self.user, today=self.today))
+        self.assertIsNotNone(cache.get(before))
+
+        noon = datetime(2026, 3, 10, 12, tzinfo=dt_timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=noon):
+            ImpactEntry.objects.create(user=self.user, metric_type='water', value=4)
+
+        self.assertNotEqual(current_key(), before)
+        result = forecast.forecast_for(self.user, today=self.today)
+        self.assertEqual(result['water']['month_to_date'], 4)
+
+
+class EventBrokerTests(TestCase):
+    def test_oldest_stream_is_evicted_at_user_limit(self):
+        async def scenario():
+            broker = events.InProcessBroker(max_per_user=2)
+            first = broker.subscribe(1)
+            second = broker.subscribe(1)
+            third = broker.subscribe(1)
+            self.assertIsNone(await first.get(timeout=1))
+            broker.publish(1, {'type': 'stats.delta'})
+            self.assertEqual(await third.get(timeout=1), {'type': 'stats.delta'})
+            self.assertEqual(await second.get(timeout=1), {'type': 'stats.delta'})
+            broker.unsubscribe(first)
+            self.assertEqual(broker._count, 2)
+
+        asyncio.run(scenario())
+
+    def test_overflowing_stream_is_told_to_resync(self):
+        async def scenario():
+            broker = events.InProcessBroker(queue_size=2)
+            subscription = broker.subscribe(1)
+            for _ in range(3):
+                subscription.offer({'type': 'stats.delta'})
+            subscription.offer({'type': 'stats.delta'})
+            self.assertEqual(await subscription.get(timeout=1), events.RESYNC_EVENT)
+            self.assertIsNone(await subscription.get(timeout=1))
+
+        asyncio.run(scenario())
+
+
+class StreamTokenTests(TestCase):
+    def test_stream_token_is_not_an_access_token(self):
+        user = User.objects.create_user('stream', password='secret-pass')
+        token = str(StreamToken.for_user(user))
+        request = RequestFactory().get('/api/v1/stats/events/', {'stream_token': token})
+        self.assertEqual(_authenticate_stream(request), user)
+
+        header = RequestFactory().get(
+            '/api/v1/entries/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertIsNone(_authenticate_stream(header))
+
+
+class SearchTests(TestCase):
+    def test_search_is_scoped_to_user(self):
+        alice = User.objects.create_user('alice', password='secret-pass')
+        bob = User.objects.create_user('bob', password='secret-pass')
+        mine = ImpactEntry.objects.create(
+            user=alice, metric_type='carbon', value=2, description='Cycled to work')
+        ImpactEntry.objects.create(
+            user=bob, metric_type='carbon', value=3, description='Cycled to the shop')
+        ImpactEntry.objects.create(
+            user=alice, metric_type='water', value=1, description='Short shower')
+
+        self.assertEqual(search.search_entries(alice, 'cycled'), [mine])
+
+
+class ThrottleTests(TestCase):
+    def setUp(self):
+        default_store.clear()
+        self.addCleanup(default_store.clear)
+
+    def test_bucket_allows_burst_then_refills(self):
+        store = TokenBucketStore()
+        key = ('entries', 1)
+        self.assertEqual(store.consume(key, 2, 1.0, now=0), 0)
+        self.assertEqual(store.consume(key, 2, 1.0, now=0), 0)
+        self.assertEqual(store.consume(key, 2, 1.0, now=0), 1.0)
+        self.assertEqual(store.consume(key, 2, 1.0, now=0.5), 0.5)
+        self.assertEqual(store.consume(key, 2, 1.0, now=1.5), 0)
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('600/min/120'), (120, 10.0))
+        self.assertEqual(parse_rate('5/s'), (5, 5.0))
+        self.assertIsNone(parse_rate(None))
+        for rate in ('0/min', '10/min/0'):
+            with self.assertRaises(ImproperlyConfigured):
+                parse_rate(rate)
+
+    def test_refused_request_spends_no_tokens(self):
+        user = User.objects.create_user('throttled', password='secret-pass')
+        client = APIClient()
+        client.force_authenticate(user)
+        rates = {'user': '10/min', 'entries': '1/min', 'stats': '1/min'}
+        with override_settings(REST_FRAMEWORK={
+                **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}):
+            self.assertEqual(client.get('/api/v1/entries/').status_code, 200)
+            for _ in range(3):
+                self.assertEqual(client.get('/api/v1/entries/').status_code, 429)
+
+        # Only the allowed request took a token from the overall budget
+        tokens = default_store._buckets['user', user.pk][0]
+        self.assertEqual(int(tokens), 9)
+
+
+class CompressionTests(TestCase):
+    @mock.patch.dict(middleware.COMPRESSORS, {'br': object(), 'zstd': None, 'gzip': object()})
+    def test_negotiate_encoding(self):
+        cases = {
+            'gzip, br': 'br',
+            'br;q=0.5, gzip': 'gzip',
+            'gzip;q=0.8, *;q=0.9': 'br',
+            'br;q=0, *': 'gzip',
+            '*;q=0': None,
+            'gzip;q=0': None,
+            'zstd': None,
+            'identity': None,
+            'gzip;q=1.2.3, br;q=abc': None,
+            '': None,
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(middleware.negotiate_encoding(header), expected)
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('sparse', password='secret-pass')
+        ImpactEntry.objects.create(
+            user=user, metric_type='carbon', value=2, description='Bus to work')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_requested_fields_only_select_those_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/entries/', {'fields': 'id,value'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([set(row) for row in response.data], [{'id', 'value'}])
+
+        entry_query = next(q['sql'] for q in queries if 'tracker_impactentry' in q['sql'])
+        self.assertIn('"value"', entry_query)
+        self.assertNotIn('"description"', entry_query)
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/v1/entries/', {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucketStore:
+    """Process-local token buckets keyed by (scope, ident).
+
+    Each bucket is a two-item list ``[tokens, last_refill]`` so a check is a
+    dict lookup plus a little float arithmetic under one lock. The store is
+    bounded: the least recently used buckets are evicted once ``max_keys`` is
+    reached, which only ever errs on the side of letting a client through.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate, now=None):
+        """Take one token; return 0 when allowed, else seconds until one is free."""
+        if now is None:
+            now = time.monotonic()
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [float(capacity), now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                elapsed = now - bucket[1]
+                bucket[0] = min(capacity, bucket[0] + elapsed * refill_rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0
+            return (1 - bucket[0]) / refill_rate
+
+    def refund(self, key, capacity):
+        """Give back a token taken by ``consume`` for a request that was refused anyway"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(capacity, bucket[0] + 1)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+default_store = TokenBucketStore()
+
+
+def parse_rate(rate):
+    """Parse ``'<count>/<period>[/<burst>]'`` into ``(capacity, refill_per_sec)``.
+
+    The period accepts DRF's ``s``/``m``/``h``/``d`` prefixes. Without an
+    explicit burst, the bucket holds a full period's worth of tokens.
+    """
+    if rate is None:
+        return None
+    parts = rate.split('/')
+    num_requests = int(parts[0])
+    duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[parts[1][0]]
+    capacity = int(parts[2]) if len(parts) > 2 else num_requests
+    if num_requests < 1 or capacity < 1:
+        raise ImproperlyConfigured(
+            f'Invalid throttle rate {rate!r}: count and burst must be at least 1')
+    return capacity, num_requests / duration
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Token bucket throttle backed by ``default_store``.
+
+    Subclasses set ``scope`` and implement ``get_ident_key``. Rates come from
+    ``DEFAULT_THROTTLE_RATES`` like DRF's built-in throttles, so a scope
+    without a rate is simply not throttled.
+
+    DRF asks every throttle even after one has refused the request. Throttles
+    of this family share per-request state so a refused request costs no
+    tokens: once one refuses, tokens already taken are refunded and the rest
+    let the request through without consuming.
+    """
+    scope = None
+    store = default_store
+
+    def __init__(self):
+        self.wait_seconds = 0
+
+    def get_scope(self, view):
+        return self.scope
+
+    def get_ident_key(self, request, view):
+        raise NotImplementedError('.get_ident_key() must be overridden')
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(view)
+        if scope is None:
+            return True
+
+        parsed = parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(scope))
+        if parsed is None:
+            return True
+
+        state = request.__dict__.setdefault(
+            '_token_buckets', {'taken': [], 'refused': False})
+        if state['refused']:
+            return True
+
+        capacity, refill_rate = parsed
+        key = (scope, self.get_ident_key(request, view))
+        self.wait_seconds = self.store.consume(key, capacity, refill_rate)
+        if self.wait_seconds:
+            for taken in state['taken']:
+                self.store.refund(*taken)
+            state['taken'] = []
+            state['refused'] = True
+            return False
+        state['taken'].append((key, capacity))
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Overall per-user budget; anonymous clients are keyed by IP."""
+    scope = 'user'
+
+    def get_ident_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return self.get_ident(request)
+
+
+class RouteTokenBucketThrottle(UserTokenBucketThrottle):
+    """Per-user budget for a single route, selected by ``view.throttle_scope``."""
+
+    def get_scope(self, view):
+        return getattr(view, 'throttle_scope', None)
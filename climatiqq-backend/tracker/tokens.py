@@ -0,0 +1,15 @@
+from datetime import timedelta
+
+from django.conf import settings
+from rest_framework_simplejwt.tokens import Token
+
+
+class StreamToken(Token):
+    """Short-lived JWT that only opens the stats event stream.
+
+    Its own token type keeps it from being accepted as an access token
+    anywhere else.
+    """
+
+    token_type = 'stream'
+    lifetime = timedelta(seconds=settings.EVENTS_TOKEN_SECONDS)
@@ -1,21 +1,30 @@
 from django.urls import path
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework import status
 from .views import (
-    RegisterView, CustomTokenObtainPairView,
-    ImpactEntryListCreateView, ImpactEntryDetailView, ImpactStatsView
+    RegisterView, CustomTokenObtainPairView, LogoutView,
+    ImpactEntryListCreateView, ImpactEntryDetailView, ImpactEntryChangesView,
+    ImpactEntrySearchView, ImpactStatsView, ActivityHeatmapView, ForecastView, entry_events,
+    StreamTokenView,
+    TeamListView, TeamTotalsView, TeamSeriesView, TeamMembersView,
+    OrganizationTotalsView
 )
 
-class LogoutView(APIView):
-    def post(self, request):
-        return Response({'message': 'Logged out successfully'}, status=status.HTTP_200_OK)
-
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', CustomTokenObtainPairView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
     path('entries/', ImpactEntryListCreateView.as_view(), name='entries'),
+    path('entries/changes/', ImpactEntryChangesView.as_view(), name='entry_changes'),
+    path('entries/search/', ImpactEntrySearchView.as_view(), name='entry_search'),
     path('entries/<int:pk>/', ImpactEntryDetailView.as_view(), name='entry_detail'),
     path('stats/', ImpactStatsView.as_view(), name='stats'),
+    path('stats/heatmap/', ActivityHeatmapView.as_view(), name='stats_heatmap'),
+    path('stats/forecast/', ForecastView.as_view(), name='stats_forecast'),
+    path('stats/events/', entry_events, name='stats_events'),
+    path('stats/events/token/', StreamTokenView.as_view(), name='stats_events_token'),
+    path('teams/', TeamListView.as_view(), name='teams'),
+    path('teams/<int:pk>/totals/', TeamTotalsView.as_view(), name='team_totals'),
+    path('teams/<int:pk>/series/', TeamSeriesView.as_view(), name='team_series'),
+    path('teams/<int:pk>/members/', TeamMembersView.as_view(), name='team_members'),
+    path('organizations/<int:pk>/totals/', OrganizationTotalsView.as_view(),
+         name='organization_totals'),
 ] 
\ No newline at end of file
@@ -1,15 +1,29 @@
-from rest_framework import generics, permissions
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from rest_framework import generics, permissions, serializers
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotFound
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum, Avg, Count
+from django.db.models import Sum, Avg, Count, F
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 from datetime import timedelta
 
-from .serializers import UserRegistrationSerializer, ImpactEntrySerializer
-from .models import ImpactEntry
+from .fields import METRIC_CODES
+from .serializers import UserRegistrationSerializer, ImpactEntrySerializer, TeamSerializer
+from .models import (
+    ImpactEntry, Team, TeamDailyTotal, TeamMembership, TeamMetricTotal, UserMetricTotal,
+)
+from .services import activity, events, forecast, ingest, search, sync
+from .tokens import StreamToken
 
 User = get_user_model()
 
@@ -59,6 +73,11 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         return response
 
 
+class LogoutView(APIView):
+    def post(self, request):
+        return Response({'message': 'Logged out successfully'}, status=200)
+
+
 # class ImpactEntryListCreateView(generics.ListCreateAPIView):
 #     serializer_class = ImpactEntrySerializer
 #     permission_classes = [permissions.IsAuthenticated]
@@ -73,31 +92,158 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 
 #     def perform_create(self, serializer):
 #         serializer.save(user=self.request.user)
-class ImpactEntryListCreateView(generics.ListCreateAPIView):
+class SparseFieldsMixin:
+    """Support ``?fields=id,value`` on reads.
+
+    Unrequested fields are dropped from the serializer and deferred in the
+    queryset, so their columns are never selected.
+    """
+
+    def get_requested_fields(self):
+        if self.request.method not in permissions.SAFE_METHODS:
+            return None
+
+        raw = self.request.query_params.get('fields')
+        if not raw:
+            return None
+
+        requested = [name.strip() for name in raw.split(',') if name.strip()]
+        available = self.serializer_class.Meta.fields
+        unknown = [name for name in requested if name not in available]
+        if unknown:
+            raise serializers.ValidationError(
+                {'fields': [f"Unknown field(s): {', '.join(unknown)}"]})
+        return requested
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_requested_fields()
+        if fields is not None:
+            queryset = queryset.only(*fields)
+        return queryset
+
+
+class IngestUnavailable(APIException):
+    # Raised before the entry is queued, so retrying cannot duplicate it
+    status_code = 503
+    default_detail = 'Too many entries are being saved right now, please retry.'
+    default_code = 'ingest_unavailable'
+    wait = 1
+
+
+class ImpactEntryListCreateView(SparseFieldsMixin, generics.ListCreateAPIView):
     serializer_class = ImpactEntrySerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'entries'
+    queryset = ImpactEntry.objects.all()
+
+    def create(self, request, *args, **kwargs):
+        try:
+            return super().create(request, *args, **kwargs)
+        except ingest.FlushTimeout:
+            # The entry is still queued and will most likely commit, so this
+            # is not an error a client should retry (that would duplicate it)
+            return Response({
+                'status': 'pending',
+                'detail': 'The entry was accepted but not confirmed in time; '
+                          'it will appear in /entries/changes/ once saved.',
+            }, status=202)
+
+    def perform_create(self, serializer):
+        if not settings.INGEST_GROUP_COMMIT:
+            serializer.save()
+            return
+
+        # Hand the row to the group-commit buffer and answer once it commits
+        entry = ImpactEntry(user=self.request.user, **serializer.validated_data)
+        try:
+            serializer.instance = ingest.get_buffer().submit(
+                entry, timeout=settings.INGEST_WAIT_SECONDS)
+        except ingest.BufferFull:
+            raise IngestUnavailable()
 
     def get_queryset(self):
-        queryset = ImpactEntry.objects.filter(user=self.request.user)
+        queryset = super().get_queryset().filter(user=self.request.user)
 
         # Read query params
         metric_type = self.request.query_params.get('metric_type')
         if metric_type:
+            if metric_type not in METRIC_CODES:
+                return queryset.none()
             queryset = queryset.filter(metric_type=metric_type)
 
         return queryset
 
 
-class ImpactEntryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ImpactEntryDetailView(SparseFieldsMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ImpactEntrySerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'entries'
+    queryset = ImpactEntry.objects.all()
 
     def get_queryset(self):
-        return ImpactEntry.objects.filter(user=self.request.user)
+        return super().get_queryset().filter(user=self.request.user)
+
+
+class ImpactEntryChangesView(APIView):
+    """Delta sync: entries changed or deleted since the client's last token"""
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'entries'
+    max_limit = 1000
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since') or 0)
+            limit = min(int(request.query_params.get('limit') or 500), self.max_limit)
+        except ValueError:
+            raise serializers.ValidationError(
+                {'since': ['Sync token and limit must be integers.']})
+
+        entries, deleted, next_token, has_more = sync.changes_since(
+            request.user, since=since, limit=max(limit, 1))
+
+        return Response({
+            'changes': ImpactEntrySerializer(entries, many=True).data,
+            'deleted': deleted,
+            'next_token': str(next_token),
+            'has_more': has_more,
+        })
+
+
+class ImpactEntrySearchView(APIView):
+    """Ranked full-text search over the user's entry descriptions"""
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'entries'
+    max_limit = 100
+
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            raise serializers.ValidationError({'q': ['A search query is required.']})
+        try:
+            limit = min(int(request.query_params.get('limit') or 20), self.max_limit)
+            offset = max(int(request.query_params.get('offset') or 0), 0)
+        except ValueError:
+            raise serializers.ValidationError(
+                {'limit': ['Limit and offset must be integers.']})
+        limit = max(limit, 1)
+
+        # Fetch one extra row to know whether another page exists
+        entries = search.search_entries(request.user, text, limit=limit + 1, offset=offset)
+
+        return Response({
+            'results': ImpactEntrySerializer(entries[:limit], many=True).data,
+            'next_offset': offset + limit if len(entries) > limit else None,
+        })
 
 
 class ImpactStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'stats'
 
     def get(self, request):
         user = request.user
@@ -124,4 +270,238 @@ class ImpactStatsView(APIView):
             'recent_entries': recent_entries_count,
             'recent_activity': recent_activity,
             'metric_breakdown': list(metric_totals),
+            **activity.activity_summary(user),
+        })
+
+
+class ActivityHeatmapView(APIView):
+    """Days with at least one entry in ``?year=`` (default: this year)"""
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'stats'
+
+    def get(self, request):
+        try:
+            year = int(request.query_params.get('year') or timezone.localdate().year)
+        except ValueError:
+            raise serializers.ValidationError({'year': ['Year must be an integer.']})
+        if not 1 <= year <= 9999:
+            raise serializers.ValidationError({'year': ['Year is out of range.']})
+
+        dates = activity.active_dates(request.user, year)
+        return Response({
+            'year': year,
+            'active_days': len(dates),
+            'active_dates': dates,
+        })
+
+
+class ForecastView(APIView):
+    """Projected end-of-month and end-of-year totals per metric"""
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'stats'
+
+    def get(self, request):
+        today = timezone.localdate()
+        return Response({
+            'as_of': today,
+            'history_days': forecast.HISTORY_DAYS,
+            'metrics': forecast.forecast_for(request.user, today),
+        })
+
+
+class TeamListView(generics.ListAPIView):
+    """Teams the current user belongs to"""
+    serializer_class = TeamSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Team.objects.filter(
+            memberships__user=self.request.user).select_related('organization')
+
+
+class TeamAccessMixin:
+    """Team rollups are visible to members; the member breakdown to managers"""
+    manager_only = False
+
+    def get_team(self, pk):
+        membership = TeamMembership.objects.filter(
+            team_id=pk, user=self.request.user).select_related('team').first()
+        if membership is None or (self.manager_only and membership.role != 'manager'):
+            raise NotFound('Team not found.')
+        return membership.team
+
+
+def _metric_totals(queryset):
+    return list(queryset.values('metric_type', 'total_value', count=F('entry_count')))
+
+
+class TeamTotalsView(TeamAccessMixin, APIView):
+    """All-time team totals, read from the incrementally maintained rollup"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        team = self.get_team(pk)
+        return Response({
+            'team': team.pk,
+            'member_count': team.memberships.count(),
+            'metric_breakdown': _metric_totals(TeamMetricTotal.objects.filter(team=team)),
+        })
+
+
+class TeamSeriesView(TeamAccessMixin, APIView):
+    """Daily team totals for the last ``?days=`` days (default 30)"""
+    permission_classes = [permissions.IsAuthenticated]
+    max_days = 366
+
+    def get(self, request, pk):
+        team = self.get_team(pk)
+        try:
+            days = min(int(request.query_params.get('days') or 30), self.max_days)
+        except ValueError:
+            raise serializers.ValidationError({'days': ['Days must be an integer.']})
+
+        start = timezone.localdate() - timedelta(days=max(days, 1) - 1)
+        series = TeamDailyTotal.objects.filter(team=team, day__gte=start).order_by(
+            'day', 'metric_type')
+        return Response({
+            'team': team.pk,
+            'start': start,
+            'series': list(series.values(
+                'day', 'metric_type', 'total_value', count=F('entry_count'))),
         })
+
+
+class TeamMembersView(TeamAccessMixin, APIView):
+    """Per-member totals for team managers; one rollup read per member"""
+    permission_classes = [permissions.IsAuthenticated]
+    manager_only = True
+
+    def get(self, request, pk):
+        team = self.get_team(pk)
+        memberships = list(
+            team.memberships.select_related('user').order_by('user__username'))
+
+        totals = {}
+        for row in UserMetricTotal.objects.filter(
+                user_id__in=[m.user_id for m in memberships]):
+            totals.setdefault(row.user_id, []).append({
+                'metric_type': row.metric_type,
+                'total_value': row.total_value,
+                'count': row.entry_count,
+            })
+
+        return Response({
+            'team': team.pk,
+            'members': [{
+                'user_id': m.user_id,
+                'username': m.user.username,
+                'role': m.role,
+                'metric_breakdown': totals.get(m.user_id, []),
+            } for m in memberships],
+        })
+
+
+class OrganizationTotalsView(APIView):
+    """Organization totals rolled up from its teams' totals"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        if not TeamMembership.objects.filter(
+                organization_id=pk, user=request.user).exists():
+            raise NotFound('Organization not found.')
+
+        team_totals = TeamMetricTotal.objects.filter(team__organization_id=pk)
+        return Response({
+            'organization': pk,
+            'team_count': Team.objects.filter(organization_id=pk).count(),
+            'metric_breakdown': list(
+                team_totals.values('metric_type').annotate(
+                    total_value=Sum('total_value'), count=Sum('entry_count'),
+                ).order_by('metric_type')),
+        })
+
+
+class StreamTokenView(APIView):
+    """Short-lived token for opening ``stats/events/`` from EventSource"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        return Response({
+            'stream_token': str(StreamToken.for_user(request.user)),
+            'expires_in': int(StreamToken.lifetime.total_seconds()),
+        })
+
+
+def _authenticate_stream(request):
+    """JWT auth for event streams.
+
+    EventSource cannot send headers, so a stream token from
+    ``stats/events/token/`` may be passed as ``?stream_token=`` instead. It
+    expires within a minute and opens nothing else, so it is harmless once
+    it ends up in proxy or access logs.
+    """
+    authenticator = JWTAuthentication()
+    try:
+        result = authenticator.authenticate(request)
+        if result is not None:
+            return result[0]
+
+        raw_token = request.GET.get('stream_token')
+        if not raw_token:
+            return None
+        return authenticator.get_user(StreamToken(raw_token))
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+
+
+async def _event_stream(broker, subscription):
+    loop = asyncio.get_running_loop()
+    heartbeat = settings.EVENTS_HEARTBEAT_SECONDS
+    # Streams are recycled so abandoned connections cannot linger forever;
+    # EventSource reconnects on its own
+    deadline = loop.time() + settings.EVENTS_MAX_STREAM_SECONDS
+
+    try:
+        yield b'retry: 3000\n\n'
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                event = await subscription.get(timeout=min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield b': keep-alive\n\n'
+                continue
+            if event is None:
+                # Replaced by a newer stream of the same user, or fell behind
+                break
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def entry_events(request):
+    """Server-sent events carrying stats deltas as the user's entries change"""
+    if not hasattr(request, 'scope'):
+        return JsonResponse(
+            {'detail': 'Event streams are only served over ASGI.'}, status=501)
+
+    user = await sync_to_async(_authenticate_stream)(request)
+    if user is None:
+        return JsonResponse(
+            {'detail': 'Authentication credentials were not provided or are invalid.'},
+            status=401)
+
+    broker = events.get_broker()
+    try:
+        subscription = broker.subscribe(user.pk)
+    except events.SubscriberLimitReached as exc:
+        response = JsonResponse({'detail': str(exc)}, status=503)
+        response['Retry-After'] = str(settings.EVENTS_HEARTBEAT_SECONDS)
+        return response
+
+    response = StreamingHttpResponse(
+        _event_stream(broker, subscription), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response